@@ -8,12 +8,13 @@
 #   * Can this integrate better with existing matplotlib animation artist flag?
 # * Example
 #   * Frameless animation - pure procedural with no loop
-#   * Need example that uses something like inotify or subprocess
 #   * Complex syncing examples
 # * Movies
 #   * Library to make movies?
 #   * RC parameter for config?
 # * Need to consider event sources to allow clicking through multiple figures
+import itertools
+import time
 from datetime import datetime
 
 def traceme(func):
@@ -24,6 +25,7 @@ def traceme(func):
         return ret
     return wrapper
 
+from collections import deque
 from matplotlib.cbook import iterable
 
 class Animation(object):
@@ -40,10 +42,40 @@ class Animation(object):
 
     *blit* is a boolean that controls whether blitting is used to optimize
     drawing.
+
+    *headless* renders offscreen without any GUI, for animations that are
+    only saved. No events are connected, no timer is created, blitting is
+    turned off, and the figure is given an Agg canvas if it doesn't have
+    one, so figures made with :func:`headless_figure` can be used without
+    pyplot.
     '''
-    def __init__(self, fig, event_source=None, blit=False):
+    # Number of frames read ahead on a background thread by _prefetched(),
+    # and the iterator doing so.
+    _prefetch = 0
+    _prefetcher = None
+
+    # How often, in frames, a snapshot of a frame sequence that can't be
+    # indexed is kept for seek(), and how many of them are kept. Zero turns
+    # the snapshots off.
+    keyframe_interval = 0
+    max_keyframes = 10
+
+    def __init__(self, fig, event_source=None, blit=False, headless=False):
+        import threading
         self._fig = fig
+        self._headless = headless
+        if headless:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            if not isinstance(fig.canvas, FigureCanvasAgg):
+                FigureCanvasAgg(fig)
+            blit = False
         self._blit = blit
+        self._saving = False
+
+        # Guards the drawing of frames, so that a movie being saved in the
+        # background with save_async() and the animation on screen take turns
+        # updating the figure.
+        self._draw_lock = threading.RLock()
 
         # These are the basics of the animation.  The frame sequence represents
         # information for each frame of the animation and depends on how the
@@ -52,9 +84,21 @@ class Animation(object):
         self.frame_seq = self.new_frame_seq()
         self.event_source = event_source
 
+        # Number of frames taken from the current frame sequence so far.
+        self._frame_number = 0
+
+        # Snapshots of the frame sequence for seek(), by frame number.
+        self._keyframes = {}
+
+        # Timings of the stages of drawing frames.
+        self.stats = FrameStats()
+
         # Clear the initial frame
         self._init_draw()
 
+        if headless:
+            return
+
         # Instead of starting the event source now, we connect to the figure's
         # draw_event, so that we only start once the figure has been drawn.
         self._first_draw_id = fig.canvas.mpl_connect('draw_event', self._start)
@@ -72,23 +116,31 @@ class Animation(object):
         '''
         # On start, we add our callback for stepping the animation and
         # actually start the event_source. We also disconnect _start
-        # from the draw_events
+        # from the draw_events, which headless animations never connected to.
         self.event_source.add_callback(self._step)
         self.event_source.start()
-        self._fig.canvas.mpl_disconnect(self._first_draw_id)
+        if not self._headless:
+            self._fig.canvas.mpl_disconnect(self._first_draw_id)
 
     def _stop(self, *args):
         # On stop we disconnect all of our events.
-        if self._blit:
-            self._fig.canvas.mpl_disconnect(self._resize_id)
-        self._fig.canvas.mpl_disconnect(self._close_id)
-        self.event_source.remove_callback(self._step)
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+        if not self._headless:
+            if self._blit:
+                self._fig.canvas.mpl_disconnect(self._resize_id)
+            self._fig.canvas.mpl_disconnect(self._close_id)
+        if self.event_source is not None:
+            self.event_source.remove_callback(self._step)
         self.event_source = None
 
     def save(self, filename, fps=5, codec='mpeg4', clear_temp=True,
-        frame_prefix='_tmp'):
+        frame_prefix='_tmp', stream=False, workers=1, factory=None):
         '''
-        Saves a movie file by drawing every frame.
+        Saves a movie file by drawing every frame. When the frames can be
+        indexed, such as a :class:`FuncAnimation` with a number or sequence of
+        *frames*, all of them are saved, however many workers are used.
 
         *fps* is the frames per second in the movie
 
@@ -100,48 +152,305 @@ class Animation(object):
         *frame_prefix* gives the prefix that should be used for individual
         image files.  This prefix will have a frame number (i.e. 0001) appended
         when saving individual frames.
+
+        *stream* controls whether frames are piped straight into the movie
+        program as raw RGBA data as they are drawn, instead of being written
+        to temporary image files first. No temporary files are created in
+        this mode, so *clear_temp* and *frame_prefix* are ignored.
+
+        *workers* is the number of processes used to render the movie. With
+        more than one worker, the frames are split into contiguous ranges and
+        each worker rebuilds the animation by calling *factory*, renders its
+        range into a movie segment, and the segments are then joined without
+        re-encoding. This needs a finite sequence of frames that can be
+        indexed (such as :class:`FuncAnimation` with a number or sequence of
+        *frames* and a *func* that only depends on the frame) and a picklable
+        *factory*, such as a module-level function, that returns the new
+        animation.
         '''
+        if workers > 1:
+            self._save_sharded(filename, fps, codec, clear_temp, frame_prefix,
+                stream, workers, factory)
+            return
+
+        frames, total = self._save_frame_seq()
+        self._save_frames(frames, filename, fps, codec, clear_temp,
+            frame_prefix, stream)
+
+    def save_async(self, filename, fps=5, codec='mpeg4', clear_temp=True,
+        frame_prefix='_tmp', stream=False):
+        '''
+        Saves a movie file like :meth:`save`, but does the work in a
+        background thread and returns immediately with a
+        :class:`SaveProgress` that reports how far along the save is and can
+        be used to cancel it or wait for it to finish.
+
+        Frames are drawn while holding the animation's draw lock, so an
+        animation that is running on screen keeps updating between frames of
+        the movie. The frames are saved at the figure's own dpi and colors,
+        so that saving doesn't change them while the figure may be on screen.
+        The GUI can still repaint the figure in the middle of a movie frame
+        being drawn, though, since that doesn't go through the lock, and then
+        briefly shows the frame being saved. To avoid that entirely, save a
+        separate, headless copy of the animation instead.
+        '''
+        import threading
+        frames, total = self._save_frame_seq()
+        progress = SaveProgress(total)
+        thread = threading.Thread(target=progress._run, args=(filename,
+            self._save_frames, frames, filename, fps, codec, clear_temp,
+            frame_prefix, stream))
+        thread.daemon = True
+        thread.start()
+        return progress
+
+    def _save_frame_seq(self):
+        # Returns the frames to save and how many there are, if that is known.
+        # When the frames can be indexed, all of them are saved, which are
+        # also the frames that the workers of a sharded save render. Otherwise
+        # the frames come from new_saved_frame_seq(), which is different from
+        # new_frame_seq() to give the ability to save 'live' generated frame
+        # information to be saved later.
+        frames = self._indexed_frames()
+        if frames is not None:
+            return self._saved_frame_range(0, len(frames)), len(frames)
+        return self.new_saved_frame_seq(), self._count_saved_frames()
+
+    def _saved_frame_range(self, start, stop):
+        # Returns the frames from number *start* up to *stop* for saving, for
+        # frames that can be indexed. This is kept apart from the frame
+        # sequence on screen, which may be in use while saving in the
+        # background.
+        frames = self._indexed_frames()
+        return (frames[i] for i in xrange(start, stop))
+
+    def _save_frames(self, frames, filename, fps, codec, clear_temp,
+        frame_prefix, stream, progress=None):
+        # Draws every frame in *frames* and assembles them into a movie.
+        # *progress* is an optional SaveProgress that is told about every
+        # finished frame, and which raises SaveCancelled to stop the save.
+        if stream:
+            self._stream_movie(filename, fps, codec, frames, progress=progress)
+            return
+
+        import os
+        # savefig normally switches the figure to the savefig dpi and colors
+        # while saving. In a background save the figure may be on screen at
+        # the same time, so it is saved as it is.
+        savefig_kw = {}
+        if progress is not None:
+            savefig_kw = dict(dpi=self._fig.dpi,
+                facecolor=self._fig.get_facecolor(),
+                edgecolor=self._fig.get_edgecolor())
         fnames = []
-        # Create a new sequence of frames for saved data. This is different
-        # from new_frame_seq() to give the ability to save 'live' generated
-        # frame information to be saved later.
-        for idx,data in enumerate(self.new_saved_frame_seq()):
-            self._draw_next_frame(data, blit=False)
-            fname = '%s%04d.png' % (frame_prefix, idx)
-            fnames.append(fname)
-            self._fig.savefig(fname)
-
-        self._make_movie(filename, fps, codec, frame_prefix)
-
-        #Delete temporary files
-        if clear_temp:
-            import os
-            for fname in fnames:
-                os.remove(fname)
-
-    def ffmpeg_cmd(self, fname, fps, codec, frame_prefix):
+        try:
+            for idx,data in enumerate(frames):
+                fname = '%s%04d.png' % (frame_prefix, idx)
+                fnames.append(fname)
+                with self._draw_lock:
+                    self._draw_save_frame(data)
+                    start = time.time()
+                    self._fig.savefig(fname, **savefig_kw)
+                    self.stats.record('save_frame', time.time() - start)
+                if progress is not None:
+                    progress._frame_done()
+            if progress is not None:
+                progress._encoding_started()
+            self._make_movie(filename, fps, codec, frame_prefix,
+                progress=progress)
+        except SaveCancelled:
+            clear_temp = True
+            raise
+        finally:
+            #Delete temporary files, also when the save failed
+            if clear_temp:
+                for fname in fnames:
+                    if os.path.exists(fname):
+                        os.remove(fname)
+
+    def _draw_save_frame(self, framedata):
+        # Draws a frame that is about to be grabbed for a movie. The figure is
+        # rendered by the grabbing itself, so there's no need to flush the
+        # frame to the screen with _post_draw(), which would also make GUI
+        # calls from the thread of a background save. _saving is set while
+        # drawing so that subclasses don't record saved frames as new ones.
+        start = time.time()
+        self._pre_draw(framedata, False)
+        drawn = time.time()
+        self._saving = True
+        try:
+            self._draw_frame(framedata)
+        finally:
+            self._saving = False
+        self.stats.record('pre_draw', drawn - start)
+        self.stats.record('draw_frame', time.time() - drawn)
+
+    def _save_sharded(self, filename, fps, codec, clear_temp, frame_prefix,
+        stream, workers, factory):
+        # Splits the frames into contiguous ranges, saves each range as a
+        # movie segment in its own process, and then joins the segments.
+        import os
+        from multiprocessing import Pool
+        if factory is None:
+            raise ValueError('Saving with multiple workers needs a factory '
+                'to rebuild the animation in each worker process.')
+        frames = self._indexed_frames()
+        if frames is None:
+            raise ValueError('Saving with multiple workers needs a finite '
+                'sequence of frames that can be indexed.')
+
+        nframes = len(frames)
+        workers = max(1, min(workers, nframes))
+        bounds = [nframes * i // workers for i in range(workers + 1)]
+        ext = os.path.splitext(filename)[1]
+        jobs = []
+        for i in range(workers):
+            jobs.append((factory, bounds[i], bounds[i + 1],
+                '%s_seg%02d%s' % (frame_prefix, i, ext), fps, codec,
+                clear_temp, '%s%02d_' % (frame_prefix, i), stream))
+
+        # A segment that fails raises its error here. Whatever segments
+        # were written are removed either way.
+        pool = Pool(workers)
+        try:
+            pool.map(_save_segment, jobs)
+            self._join_movies(filename, [job[3] for job in jobs],
+                frame_prefix)
+        finally:
+            pool.close()
+            pool.join()
+            for job in jobs:
+                if os.path.exists(job[3]):
+                    os.remove(job[3])
+
+    def _indexed_frames(self):
+        # Returns a sequence of the frame information that can be indexed by
+        # frame number, or None if the frames can only be iterated over.
+        return None
+
+    def _count_saved_frames(self):
+        # Returns the number of frames new_saved_frame_seq() will give, or
+        # None if that isn't known without going through them.
+        return None
+
+    def ffmpeg_cmd(self, fname, fps, codec, frame_prefix, frame_size=None):
         # Returns the command line parameters for subprocess to use
-        # ffmpeg to create a movie
-        return ['ffmpeg', '-y', '-r', str(fps), '-b', '1800k', '-i',
-            '%s%%04d.png' % frame_prefix, fname]
+        # ffmpeg to create a movie. If *frame_size* (width, height) is given,
+        # raw RGBA frames are read from stdin instead of from image files.
+        if frame_size is None:
+            source = ['-i', '%s%%04d.png' % frame_prefix]
+        else:
+            source = ['-f', 'rawvideo', '-pix_fmt', 'rgba', '-s',
+                '%dx%d' % tuple(frame_size), '-i', '-']
+        return ['ffmpeg', '-y', '-r', str(fps), '-b', '1800k'] + source + [
+            fname]
 
-    def mencoder_cmd(self, fname, fps, codec, frame_prefix):
+    def mencoder_cmd(self, fname, fps, codec, frame_prefix, frame_size=None):
         # Returns the command line parameters for subprocess to use
-        # mencoder to create a movie
-        return ['mencoder', 'mf://%s*.png' % frame_prefix, '-mf',
-            'type=png:fps=%d' % fps, '-ovc', 'lavc', '-lavcopts',
+        # mencoder to create a movie. If *frame_size* (width, height) is given,
+        # raw RGBA frames are read from stdin instead of from image files.
+        if frame_size is None:
+            source = ['mf://%s*.png' % frame_prefix, '-mf',
+                'type=png:fps=%d' % fps]
+        else:
+            source = ['-', '-demuxer', 'rawvideo', '-rawvideo',
+                'fps=%d:w=%d:h=%d:format=rgba' % ((fps,) + tuple(frame_size))]
+        return ['mencoder'] + source + ['-ovc', 'lavc', '-lavcopts',
             'vcodec=%s' % codec, '-oac', 'copy', '-o', fname]
 
-    def _make_movie(self, fname, fps, codec, frame_prefix, cmd_gen=None):
+    def _make_movie(self, fname, fps, codec, frame_prefix, cmd_gen=None,
+        progress=None):
         # Uses subprocess to call the program for assembling frames into a
         # movie file.  *cmd_gen* is a callable that generates the sequence
         # of command line arguments from a few configuration options.
+        # Cancelling *progress* stops the program.
+        if cmd_gen is None:
+            cmd_gen = self.ffmpeg_cmd
+        _run_movie_program(cmd_gen(fname, fps, codec, frame_prefix), progress)
+
+    def ffmpeg_concat_cmd(self, fname, list_fname):
+        # Returns the command line parameters for subprocess to use ffmpeg
+        # to join the movie segments listed in *list_fname* without
+        # re-encoding them.
+        return ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_fname,
+            '-c', 'copy', fname]
+
+    def _join_movies(self, fname, segments, frame_prefix, cmd_gen=None):
+        # Uses subprocess to call the program for joining movie *segments*
+        # into a single movie file. The segments are handed over in a list
+        # file, which is removed afterwards.
+        import os
+        if cmd_gen is None:
+            cmd_gen = self.ffmpeg_concat_cmd
+        list_fname = '%s_segments.txt' % frame_prefix
+        list_file = open(list_fname, 'w')
+        try:
+            for seg in segments:
+                list_file.write("file '%s'\n" % os.path.abspath(seg))
+        finally:
+            list_file.close()
+        try:
+            _run_movie_program(cmd_gen(fname, list_fname))
+        finally:
+            os.remove(list_fname)
+
+    def _open_movie_pipe(self, fname, fps, codec, frame_size, cmd_gen=None):
+        # Starts the program for assembling frames into a movie file, reading
+        # raw RGBA frames of *frame_size* from its stdin. Returns the process.
         from subprocess import Popen, PIPE
         if cmd_gen is None:
             cmd_gen = self.ffmpeg_cmd
-        proc = Popen(cmd_gen(fname, fps, codec, frame_prefix), shell=False,
-            stdout=PIPE, stderr=PIPE)
-        proc.wait()
+        return Popen(cmd_gen(fname, fps, codec, None, frame_size),
+            shell=False, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+
+    def _stream_movie(self, fname, fps, codec, frames, cmd_gen=None,
+        progress=None):
+        # Draws each frame in *frames* and streams it as raw RGBA data into
+        # the movie program, so that no image files touch the disk. Frames
+        # are handed to a background thread for writing, which lets rendering
+        # of the next frame overlap with encoding of the previous ones. The
+        # frame buffer is copied, since the renderer reuses it on every draw.
+        proc = self._open_movie_pipe(fname, fps, codec,
+            self._fig.canvas.get_width_height(), cmd_gen)
+        pipe = _FramePipe(proc, self._save_queue_size,
+            progress._cancel_event if progress is not None else None)
+        try:
+            for data in frames:
+                with self._draw_lock:
+                    self._draw_save_frame(data)
+                    start = time.time()
+                    frame = str(self._grab_frame())
+                    self.stats.record('save_frame', time.time() - start)
+                pipe.write(frame)
+                if progress is not None:
+                    progress._frame_done()
+            if progress is not None:
+                progress._encoding_started()
+            pipe.close()
+        except:
+            pipe.abort()
+            raise
+
+    # Number of rendered frames that can be waiting to be written when
+    # streaming a movie, which bounds the memory used if encoding falls behind.
+    _save_queue_size = 8
+
+    def _grab_frame(self):
+        # Renders the figure at its own dpi and returns the RGBA pixel data.
+        # Agg based canvases are drawn offscreen and the renderer's buffer is
+        # handed out without copying, which skips savefig and any image
+        # compression; the buffer is only valid until the next draw. Other
+        # canvases fall back to printing raw RGBA data through savefig.
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        canvas = self._fig.canvas
+        if isinstance(canvas, FigureCanvasAgg):
+            FigureCanvasAgg.draw(canvas)
+            return canvas.buffer_rgba()
+
+        from cStringIO import StringIO
+        buf = StringIO()
+        self._fig.savefig(buf, format='rgba', dpi=self._fig.dpi)
+        return buf.getvalue()
 
     def _step(self, *args):
         '''
@@ -152,12 +461,120 @@ class Animation(object):
         # call _step, until the frame sequence reaches the end of iteration,
         # at which point False will be returned.
         try:
+            start = self.stats.tick()
+            if self.keyframe_interval:
+                self._keep_keyframe()
             framedata = self.frame_seq.next()
-            self._draw_next_frame(framedata, self._blit)
+            self.stats.record('frame_seq', time.time() - start)
+            self._frame_number += 1
+            with self._draw_lock:
+                self._draw_next_frame(framedata, self._blit)
             return True
         except StopIteration:
             return False
 
+    def _skip_frames(self, count):
+        # Moves *count* frames ahead in the frame sequence without drawing
+        # them. Returns the number of frames actually skipped, which is less
+        # than *count* if the end of the sequence was reached. The default
+        # just advances the iterator, which is all that can be done for a
+        # generator and is cheap for other sequences.
+        skipped = 0
+        try:
+            while skipped < count:
+                if self.keyframe_interval:
+                    self._keep_keyframe()
+                self.frame_seq.next()
+                skipped += 1
+                self._frame_number += 1
+        except StopIteration:
+            pass
+        return skipped
+
+    def seek(self, frame):
+        '''
+        Shows frame number *frame* (counting from 0) of the current pass
+        through the frames, and carries on from there.
+
+        Frames that can be indexed, such as a list or a number of frames, are
+        looked up directly. For a generator, the frames before the one asked
+        for have to be generated again, without being drawn. To limit that,
+        set :attr:`keyframe_interval` to a number of frames: a snapshot of the
+        generator is then kept every that many frames, up to
+        :attr:`max_keyframes` of the latest ones, and seeking only has to
+        generate the frames after the nearest snapshot. The snapshots hold on
+        to the frame data generated since the oldest of them.
+
+        Raises IndexError if there is no such frame.
+        '''
+        import copy
+        if frame < 0:
+            raise IndexError('Frame number %d is negative' % frame)
+        with self._draw_lock:
+            frames = self._indexed_frames()
+            if frames is not None:
+                if frame >= len(frames):
+                    raise IndexError('Frame number %d is past the last frame '
+                        '(%d)' % (frame, len(frames) - 1))
+                self.frame_seq = self._indexed_frame_seq(frame)
+                self._frame_number = frame
+            else:
+                # Start from the latest snapshot before the frame, unless
+                # going forward from where the sequence is now is closer.
+                # Without either, the sequence is started over.
+                before = [n for n in self._keyframes if n <= frame]
+                if self._frame_number <= frame and (not before or
+                        max(before) <= self._frame_number):
+                    pass
+                elif before:
+                    n = max(before)
+                    self.frame_seq = copy.copy(self._keyframes[n])
+                    self._frame_number = n
+                else:
+                    self._keyframes.clear()
+                    self.frame_seq = self.new_frame_seq()
+                    self._frame_number = 0
+                self._skip_frames(frame - self._frame_number)
+                if self._frame_number < frame:
+                    raise IndexError('Frame number %d is past the last frame '
+                        '(%d)' % (frame, self._frame_number - 1))
+            Animation._step(self)
+
+    def _indexed_frame_seq(self, start):
+        # Returns a frame sequence starting at frame number *start*, for
+        # frames that can be indexed.
+        frames = self._indexed_frames()
+        return (frames[i] for i in xrange(start, len(frames)))
+
+    def _keep_keyframe(self):
+        # Keeps a snapshot of the frame sequence every keyframe_interval
+        # frames, when the frames can't be indexed instead. Generators can't
+        # be copied, but the iterators made by itertools.tee can, so the
+        # frame sequence is switched to one.
+        import copy
+        n = self._frame_number
+        if n % self.keyframe_interval or n in self._keyframes:
+            return
+        if self._indexed_frames() is not None:
+            return
+        if isinstance(self.frame_seq, _tee_type):
+            snapshot = copy.copy(self.frame_seq)
+        else:
+            self.frame_seq, snapshot = itertools.tee(self.frame_seq)
+        self._keyframes[n] = snapshot
+        while len(self._keyframes) > self.max_keyframes:
+            del self._keyframes[min(self._keyframes)]
+
+    def _prefetched(self, seq):
+        # Returns the frame sequence *seq* run on a background thread, if
+        # prefetching, shutting down the thread of any earlier sequence.
+        if not self._prefetch:
+            return seq
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+        self._prefetcher = _PrefetchIterator(seq, self._prefetch)
+        return self._prefetcher
+
     def new_frame_seq(self):
         'Creates a new sequence of frame information.'
         # Default implementation is just an iterator over self._framedata
@@ -170,10 +587,18 @@ class Animation(object):
 
     def _draw_next_frame(self, framedata, blit):
         # Breaks down the drawing of the next frame into steps of pre- and
-        # post- draw, as well as the drawing of the frame itself.
+        # post- draw, as well as the drawing of the frame itself. Each step
+        # is timed for the statistics.
+        start = time.time()
         self._pre_draw(framedata, blit)
+        pre_drawn = time.time()
         self._draw_frame(framedata)
+        drawn = time.time()
         self._post_draw(framedata, blit)
+        stats = self.stats
+        stats.record('pre_draw', pre_drawn - start)
+        stats.record('draw_frame', drawn - pre_drawn)
+        stats.record('post_draw', time.time() - drawn)
 
     def _init_draw(self):
         # Initial draw to clear the frame. Also used by the blitting code
@@ -198,39 +623,304 @@ class Animation(object):
         if blit and self._drawn_artists:
             self._blit_draw(self._drawn_artists, self._blit_cache)
         else:
+            self._request_draw()
+
+    def _request_draw(self):
+        # Asks for the figure to be redrawn. An event source that drives
+        # several animations (like AnimationGroup) can take over the request
+        # with defer_draw(), so that each canvas is only redrawn once for all
+        # the animations on it.
+        # Headless animations leave drawing to whoever grabs the frames.
+        defer_draw = getattr(self.event_source, 'defer_draw', None)
+        if defer_draw is not None and defer_draw(self._fig.canvas):
+            return
+        if not self._headless:
             self._fig.canvas.draw_idle()
 
     # The rest of the code in this class is to facilitate easy blitting
     def _blit_draw(self, artists, bg_cache):
         # Handles blitted drawing, which renders only the artists given instead
         # of the entire figure.
-        updated_ax = []
+        updated_ax = {}
+        fresh_ax = set()
+
+        # If the limits, position or contents of an axes have changed since
+        # its background was saved (such as by a scrolling StreamingLine), the
+        # background is out of date and the axes is drawn again. The areas
+        # redrawn outside of the axes, such as the tick labels, are blitted
+        # along with everything else below.
+        redrawn = []
+        for ax in set(a.axes for a in artists):
+            if ax in bg_cache and self._blit_keys.get(ax) != self._axes_key(ax):
+                region = self._redraw_axes(ax, bg_cache)
+                if region is not None:
+                    redrawn.append((ax.figure.canvas, region))
+
         for a in artists:
             # If we haven't cached the background for this axes object, do
             # so now. This might not always be reliable, but it's an attempt
             # to automate the process.
             if a.axes not in bg_cache:
-                bg_cache[a.axes] = a.figure.canvas.copy_from_bbox(a.axes.bbox)
+                self._save_background(a.axes, bg_cache)
+            if a.axes in self._blit_fresh:
+                fresh_ax.add(a.axes)
             a.axes.draw_artist(a)
-            updated_ax.append(a.axes)
 
-        # After rendering all the needed artists, blit each axes individually.
-        for ax in set(updated_ax):
-            ax.figure.canvas.blit(ax.bbox)
+            # Remember where the artist ended up, so that the next frame only
+            # needs to clear and blit that area.
+            extent = self._artist_extent(a)
+            self._blit_extents[a] = extent
+            updated_ax.setdefault(a.axes, []).append(extent)
+
+        # After rendering all the needed artists, work out what to blit for
+        # each axes. Only the area that was cleared for this frame plus the
+        # area covered by the new artists needs to go to the screen. Axes that
+        # were cleared but had nothing drawn on them still need the cleared
+        # area blitted. The areas are collected for each canvas and flushed
+        # together.
+        cleared = self._blit_dirty
+        self._blit_dirty = {}
+        blits = {}
+        for ax in set(updated_ax) | set(cleared):
+            canvas_blits = blits.setdefault(ax.figure.canvas, [])
+            if ax in fresh_ax:
+                canvas_blits.append(ax.bbox)
+                continue
+            extents = updated_ax.get(ax, [])
+            if ax in cleared:
+                extents.append(cleared[ax])
+            dirty = self._dirty_bbox(ax, extents)
+            if dirty is None:
+                canvas_blits.append(ax.bbox)
+            elif dirty.width > 0 and dirty.height > 0:
+                canvas_blits.append(dirty)
+        for canvas, region in redrawn:
+            blits.setdefault(canvas, []).append(region)
+        self._blit_fresh.clear()
+        for canvas, bboxes in blits.iteritems():
+            self._flush_blits(canvas, bboxes)
+
+    def _flush_blits(self, canvas, bboxes):
+        # Puts the areas *bboxes* of *canvas* on the screen, with as few blits
+        # as possible. An event source that drives several animations (like
+        # AnimationGroup) can take the areas over with defer_blit(), to merge
+        # them with those of the other animations on the same canvas.
+        defer_blit = getattr(self.event_source, 'defer_blit', None)
+        if defer_blit is not None and defer_blit(canvas, bboxes):
+            return
+        for bbox in _merge_bboxes(bboxes):
+            canvas.blit(bbox)
+
+    def _axes_key(self, ax):
+        # The things about an axes that its saved background depends on,
+        # besides changes to its artists that don't add or remove any.
+        return (ax.viewLim.bounds, ax.bbox.bounds, ax.get_xscale(),
+            ax.get_yscale(), len(ax.get_children()))
+
+    def _save_background(self, ax, bg_cache):
+        # Saves the background of *ax* from the canvas, along with what it
+        # depends on and the area the axes covers including its labels.
+        canvas = ax.figure.canvas
+        bg_cache[ax] = canvas.copy_from_bbox(ax.bbox)
+        self._blit_keys[ax] = self._axes_key(ax)
+        self._blit_outlines[ax] = self._axes_outline(ax)
+        self._blit_fresh.add(ax)
+
+    def _axes_outline(self, ax):
+        # Returns the area covered by *ax* and its labels, or None if it
+        # can't be worked out.
+        get_renderer = getattr(ax.figure.canvas, 'get_renderer', None)
+        if get_renderer is None:
+            return None
+        try:
+            return ax.get_tightbbox(get_renderer())
+        except Exception:
+            return None
+
+    def _redraw_axes(self, ax, bg_cache):
+        # Draws the static parts of *ax* again, in place, and saves its new
+        # background, returning the area of the canvas that was redrawn. The
+        # area the axes used to cover is painted over with the figure's
+        # background first, and other axes reaching into that area are drawn
+        # again along with it. If other parts of the figure are in the way,
+        # or the canvas can't draw just part of the figure, the whole figure
+        # is redrawn instead and all of its backgrounds are dropped, to be
+        # saved again, in which case None is returned. Either way, the
+        # animated artists are left out, as they are from any background.
+        from matplotlib.transforms import Bbox
+        fig = ax.figure
+        canvas = fig.canvas
+        old = self._blit_outlines.get(ax)
+        new = self._axes_outline(ax)
+        group = None
+        if old is not None and new is not None and fig.patch.get_visible():
+            group, region = self._overlapping_axes(ax, Bbox.union([old, new]))
+
+        hidden = [a for a in self._drawn_artists if a.get_visible() and
+            (group is None or a.axes in group)]
+        for a in hidden:
+            a.set_visible(False)
+        try:
+            if group is None:
+                for other in fig.axes:
+                    bg_cache.pop(other, None)
+                canvas.draw()
+                return None
+
+            renderer = canvas.get_renderer()
+            clip = fig.patch.clipbox
+            try:
+                fig.patch.set_clip_box(region)
+                fig.patch.draw(renderer)
+            finally:
+                fig.patch.set_clip_box(clip)
+            for other in group:
+                other.draw(renderer)
+        finally:
+            for a in hidden:
+                a.set_visible(True)
+        for other in group:
+            self._save_background(other, bg_cache)
+        return region
+
+    def _overlapping_axes(self, ax, area):
+        # Works out what to draw again to repaint *area* around *ax* in
+        # place: the region to paint, which covers *area* padded to whole
+        # pixels, and the axes that might be drawn in it, starting with *ax*
+        # and in drawing order. Other axes that reach into the region are
+        # drawn whole, so the region grows to cover them, and so on. Returns
+        # None for both if anything else in the figure might be drawn there.
+        import math
+        from matplotlib.transforms import Bbox
+        fig = ax.figure
+        if fig.images or fig.lines or fig.patches or fig.artists:
+            return None, None
+        renderer = fig.canvas.get_renderer()
+        extents = [artist.get_window_extent(renderer)
+            for artist in fig.texts + fig.legends if artist.get_visible()]
+        rest = [other for other in fig.axes if other is not ax]
+        group = [ax]
+        region = None
+        while area is not None:
+            x0, y0, x1, y1 = area.extents
+            area = Bbox.from_extents(math.floor(x0) - 2, math.floor(y0) - 2,
+                math.ceil(x1) + 2, math.ceil(y1) + 2)
+            if region is not None:
+                area = Bbox.union([region, area])
+            region = Bbox.intersection(fig.bbox, area)
+            if region is None:
+                return None, None
+            for extent in extents:
+                if _overlaps(extent, region):
+                    return None, None
+
+            # Take in the axes reaching into the region, which makes it grow.
+            grown = []
+            for other in list(rest):
+                outline = self._axes_outline(other)
+                if outline is None:
+                    return None, None
+                if _overlaps(outline, region):
+                    rest.remove(other)
+                    group.append(other)
+                    grown.append(outline)
+            area = Bbox.union(grown) if grown else None
+
+        group.sort(key=lambda a: (a.get_zorder(), fig.axes.index(a)))
+        return group, region
 
     def _blit_clear(self, artists, bg_cache):
         # Get a list of the axes that need clearing from the artists that
         # have been drawn. Grab the appropriate saved background from the
-        # cache and restore.
-        axes = set(a.axes for a in artists)
-        for a in axes:
-            a.figure.canvas.restore_region(bg_cache[a])
+        # cache and restore it, but only over the area the artists covered
+        # when they were drawn, unless that is most of the axes anyway.
+        axes = {}
+        for a in artists:
+            axes.setdefault(a.axes, []).append(self._blit_extents.get(a))
+        for ax, extents in axes.iteritems():
+            dirty = self._dirty_bbox(ax, extents)
+            if dirty is None:
+                ax.figure.canvas.restore_region(bg_cache[ax])
+            elif dirty.width > 0 and dirty.height > 0:
+                self._restore_bbox(ax.figure.canvas, bg_cache[ax], dirty)
+            self._blit_dirty[ax] = dirty
+
+    # When the dirty area of an axes is more than this fraction of the axes,
+    # the whole axes is restored and blitted instead.
+    _blit_dirty_fraction = 0.5
+
+    def _artist_extent(self, artist):
+        # Returns the bounding box of the artist in display coordinates, an
+        # empty (null) box if it doesn't cover anything, or None if that
+        # can't be worked out.
+        from matplotlib.transforms import Bbox
+        if not artist.get_visible():
+            return Bbox.null()
+        get_renderer = getattr(artist.figure.canvas, 'get_renderer', None)
+        if get_renderer is None:
+            return None
+        try:
+            extent = artist.get_window_extent(get_renderer())
+        except Exception:
+            return None
+        if extent is None:
+            return None
+        x0, y0, x1, y1 = extent.extents
+        if not (abs(x0) < 1e9 and abs(y0) < 1e9 and abs(x1) < 1e9 and
+                abs(y1) < 1e9):
+            return Bbox.null()
+        return extent
+
+    def _dirty_bbox(self, ax, extents):
+        # Works out the area of *ax* that is covered by *extents*, padded to
+        # allow for antialiasing and clipped to the axes. Returns None when
+        # the whole axes should be used instead, because an extent is unknown
+        # or the area is too large to be worth it.
+        import math
+        from matplotlib.transforms import Bbox
+        if not extents or None in extents:
+            return None
+        dirty = Bbox.union(extents)
+        if not (dirty.width >= 0 and dirty.height >= 0):
+            return Bbox.null()
+        x0, y0, x1, y1 = dirty.extents
+        dirty = Bbox.from_extents(math.floor(x0) - 2, math.floor(y0) - 2,
+            math.ceil(x1) + 2, math.ceil(y1) + 2)
+        dirty = Bbox.intersection(dirty, ax.bbox)
+        if dirty is None:
+            return Bbox.null()
+        if (dirty.width * dirty.height >
+                self._blit_dirty_fraction * ax.bbox.width * ax.bbox.height):
+            return None
+        return dirty
+
+    def _restore_bbox(self, canvas, region, bbox):
+        # Restores the part of the saved *region* under *bbox* (in display
+        # coordinates) in place. The canvas measures regions from the top of
+        # the figure, so the box is flipped to match.
+        x0, y0 = region.get_extents()[:2]
+        height = canvas.figure.bbox.height
+        canvas.restore_region(region, bbox=(bbox.x0, height - bbox.y1,
+            bbox.x1, height - bbox.y0), xy=(x0, y0))
 
     def _setup_blit(self):
         # Setting up the blit requires: a cache of the background for the
         # axes
         self._blit_cache = dict()
         self._drawn_artists = []
+
+        # Where each artist was last drawn, and the areas of the axes that
+        # have been cleared for the frame being drawn, for blitting only what
+        # changed.
+        self._blit_extents = dict()
+        self._blit_dirty = dict()
+
+        # What the background of each axes depended on when it was saved, the
+        # area the axes and its labels covered then, and the axes whose
+        # backgrounds were saved for the frame being drawn.
+        self._blit_keys = dict()
+        self._blit_outlines = dict()
+        self._blit_fresh = set()
         self._resize_id = self._fig.canvas.mpl_connect('resize_event',
             self._handle_resize)
         self._post_draw(None, self._blit)
@@ -243,6 +933,11 @@ class Animation(object):
         self._fig.canvas.mpl_disconnect(self._resize_id)
         self.event_source.stop()
         self._blit_cache.clear()
+        self._blit_extents.clear()
+        self._blit_dirty.clear()
+        self._blit_keys.clear()
+        self._blit_outlines.clear()
+        self._blit_fresh.clear()
         self._init_draw()
         self._resize_id = self._fig.canvas.mpl_connect('draw_event', self._end_redraw)
 
@@ -266,21 +961,53 @@ class TimedAnimation(Animation):
 
     *repeat_delay* optionally adds a delay in milliseconds before repeating
     the animation.
+
+    *realtime* keeps the animation in step with the wall clock: frame *n* is
+    due *n* * *interval* milliseconds after the animation started, and when
+    drawing falls behind, the frames that are already stale are skipped
+    instead of drawn. The number of skipped frames is kept in
+    *frames_dropped*.
+
+    *replay_cache* optionally gives a number of bytes of memory to use for
+    keeping the rendered pixels of frames when repeating. Frames drawn on the
+    first pass are captured (the whole figure, or the blitted axes), and later
+    passes restore them instead of drawing the artists again, evicting the
+    least recently used frames to stay within the budget. This is only valid
+    for animations that draw exactly the same thing on every pass, such as
+    an :class:`ArtistAnimation` or a :class:`FuncAnimation` with a fixed
+    sequence of frames. It needs an Agg based canvas.
     '''
     def __init__(self, fig, interval=200, repeat_delay=None, repeat=True,
-            event_source=None, *args, **kwargs):
+            event_source=None, realtime=False, replay_cache=None, *args,
+            **kwargs):
         # Store the timing information
         self._interval = interval
         self._repeat_delay = repeat_delay
         self.repeat = repeat
 
+        # Wall clock time at which the current pass through the frames
+        # started, set on its first step when running in real time.
+        self._realtime = realtime
+        self._clock_start = None
+        self.frames_dropped = 0
+
+        # Rendered frames kept for later passes, the axes they were captured
+        # from when blitting, and whether the last frame was a replayed one.
+        self._replay = None
+        if replay_cache:
+            self._replay = _ReplayCache(replay_cache)
+        self._replay_axes = set()
+        self._replayed = False
+
         # If we're not given an event source, create a new timer. This permits
         # sharing timers between animation objects for syncing animations.
-        if event_source is None:
+        # Headless animations don't need one.
+        if event_source is None and not kwargs.get('headless', False):
             event_source = fig.canvas.new_timer()
             event_source.interval = self._interval
 
         Animation.__init__(self, fig, event_source=event_source, *args, **kwargs)
+        self.stats.interval = self._interval
 
     def _step(self, *args):
         '''
@@ -291,6 +1018,8 @@ class TimedAnimation(Animation):
         # we refresh the frame sequence and return True. If _repeat_delay is
         # set, change the event_source's interval to our loop delay and set the
         # callback to one which will then set the interval back.
+        if self._realtime:
+            self._drop_stale_frames()
         still_going = Animation._step(self, *args)
         if not still_going and self.repeat:
             if self._repeat_delay:
@@ -298,19 +1027,113 @@ class TimedAnimation(Animation):
                 self.event_source.interval = self._repeat_delay
                 self.event_source.add_callback(self._loop_delay)
             self.frame_seq = self.new_frame_seq()
+            self._frame_number = 0
+            self._keyframes.clear()
+            self._clock_start = None
+            if self._replay is not None:
+                self._replay.end_pass()
             return True
         else:
             return still_going
 
+    def _draw_next_frame(self, framedata, blit):
+        # With a replay cache, frames that were rendered on an earlier pass
+        # are restored from their pixels instead of being drawn again.
+        cache = self._replay
+        if cache is None:
+            Animation._draw_next_frame(self, framedata, blit)
+            return
+
+        key = self._frame_number - 1
+        canvas = self._fig.canvas
+        start = time.time()
+        regions = cache.get(key, self._replay_state(blit))
+        if regions is not None:
+            for bbox, region in regions:
+                canvas.restore_region(region)
+            self._flush_blits(canvas, [bbox for bbox, region in regions])
+            self._replayed = True
+            self.stats.record('replay', time.time() - start)
+            return
+
+        if self._replayed and blit:
+            self._discard_replayed()
+        self._replayed = False
+        Animation._draw_next_frame(self, framedata, blit)
+        self._capture_frame(key, blit and self._drawn_artists)
+
+    def _replay_state(self, blit):
+        # What the cached frames depend on, other than the frame itself.
+        return (tuple(self._fig.bbox.bounds), bool(blit),
+            frozenset(self._replay_axes))
+
+    def _capture_frame(self, key, blit):
+        # Copies the rendered pixels of the frame into the replay cache: every
+        # axes that has been blitted so far, or the whole figure.
+        # *blit* tells whether the frame was actually blitted.
+        canvas = self._fig.canvas
+        if not hasattr(canvas, 'copy_from_bbox'):
+            self._replay = None
+            return
+        if blit:
+            self._replay_axes.update(a.axes for a in self._drawn_artists)
+            bboxes = [ax.bbox for ax in self._replay_axes]
+        else:
+            bboxes = [self._fig.bbox]
+        regions = [(bbox, canvas.copy_from_bbox(bbox)) for bbox in bboxes]
+        nbytes = sum(4 * int(bbox.width) * int(bbox.height)
+            for bbox in bboxes)
+        self._replay.put(key, self._replay_state(self._blit), regions, nbytes)
+
+    def _discard_replayed(self):
+        # The canvas is showing a replayed frame, which the blitting code
+        # knows nothing about. Put back the clean background of every cached
+        # axes and have the next blit clear and flush them all.
+        for ax in self._replay_axes:
+            ax.figure.canvas.restore_region(self._blit_cache[ax])
+            self._blit_dirty[ax] = None
+        for a in self._blit_extents:
+            self._blit_extents[a] = None
+
+    def _post_draw(self, framedata, blit):
+        # Frames need to be rendered right away to be captured for replay,
+        # so the usual idle redraw is replaced with a full one.
+        if self._replay is not None and not (blit and self._drawn_artists):
+            self._fig.canvas.draw()
+        else:
+            Animation._post_draw(self, framedata, blit)
+
+    def seek(self, frame):
+        Animation.seek(self, frame)
+        # In real time, carry on as though the animation had been playing up
+        # to this frame.
+        if self._clock_start is not None:
+            self._clock_start = (time.time() -
+                self._frame_number * self._interval / 1000.)
+
+    def _drop_stale_frames(self):
+        # Works out which frame should be on screen now, given the time since
+        # the start of this pass, and skips any frames before it that have
+        # not been drawn yet.
+        now = time.time()
+        if self._clock_start is None:
+            self._clock_start = now
+        due = int((now - self._clock_start) * 1000. / self._interval)
+        if due > self._frame_number:
+            self.frames_dropped += self._skip_frames(due - self._frame_number)
+
     def _stop(self, *args):
         # If we stop in the middle of a loop delay (which is relatively likely
         # given the potential pause here, remove the loop_delay callback as
         # well.
-        self.event_source.remove_callback(self._loop_delay)
+        if self.event_source is not None:
+            self.event_source.remove_callback(self._loop_delay)
         Animation._stop(self)
 
     def _loop_delay(self, *args):
-        # Reset the interval and change callbacks after the delay.
+        # Reset the interval and change callbacks after the delay. The delay
+        # shouldn't count as a late tick.
+        self.stats.reset_tick()
         self.event_source.remove_callback(self._loop_delay)
         self.event_source.interval = self._interval
         self.event_source.add_callback(self._step)
@@ -332,42 +1155,89 @@ class ArtistAnimation(TimedAnimation):
         # Use the list of artists as the framedata, which will be iterated
         # over by the machinery.
         self._framedata = artists
+        self._plan_frames()
         TimedAnimation.__init__(self, fig, *args, **kwargs)
 
+    def _plan_frames(self):
+        # Works out up front everything about the frames that doesn't change
+        # while animating: the set of artists in each frame, the artists to
+        # hide and show when moving on from each frame to the next (wrapping
+        # around for repeats), and the unique figures involved. Frames are
+        # recognized by identity; a frame object that appears more than once
+        # can't be told apart by position, so it gets no index.
+        sets = [frozenset(f) for f in self._framedata]
+        self._frame_sets = sets
+        self._frame_index = {}
+        for i, f in enumerate(self._framedata):
+            if id(f) in self._frame_index:
+                self._frame_index[id(f)] = None
+            else:
+                self._frame_index[id(f)] = i
+        self._transitions = [(sets[i - 1] - sets[i], sets[i] - sets[i - 1])
+            for i in range(len(sets))]
+        self._all_artists = frozenset().union(*sets)
+        self._figures = set(a.figure for a in self._all_artists)
+
+        # The artists currently made visible by the animation, and the index
+        # of the frame they belong to, if known.
+        self._visible_artists = frozenset()
+        self._shown_index = None
+
     def _init_draw(self):
-        # Make all the artists involved in *any* frame invisible
-        axes = []
-        for f in self.new_frame_seq():
-            for artist in f:
-                artist.set_visible(False)
-                # Assemble a list of unique axes that need flushing
-                if artist.axes not in axes:
-                    axes.append(artist.axes)
-
-        # Flush the needed axes
-        for ax in axes:
-            ax.figure.canvas.draw()
+        # Make all the artists involved in *any* frame invisible, then flush
+        # each figure involved once.
+        for artist in self._all_artists:
+            artist.set_visible(False)
+        self._visible_artists = frozenset()
+        self._shown_index = None
+
+        if self._headless:
+            return
+        for fig in self._figures:
+            fig.canvas.draw()
+
+    def _indexed_frames(self):
+        return self._framedata
 
     def _pre_draw(self, framedata, blit):
         '''
         Clears artists from the last frame.
         '''
+        # Only blitting needs any clearing here. Otherwise, the artists from
+        # the previous frame that aren't in the new one are hidden by
+        # _draw_frame(), which knows which ones they are.
         if blit:
             # Let blit handle clearing
             self._blit_clear(self._drawn_artists, self._blit_cache)
-        else:
-            # Otherwise, make all the artists from the previous frame invisible
-            for artist in self._drawn_artists:
-                artist.set_visible(False)
 
     def _draw_frame(self, artists):
         # Save the artists that were passed in as framedata for the other
         # steps (esp. blitting) to use.
         self._drawn_artists = artists
 
-        # Make all the artists from the current frame visible
-        for artist in artists:
+        # Moving on to the next frame in order uses the planned transition.
+        # Otherwise, compare the new frame with what is currently visible.
+        index = self._frame_index.get(id(artists))
+        shown = self._shown_index
+        if (index is not None and shown is not None and
+                index == (shown + 1) % len(self._frame_sets)):
+            hide, show = self._transitions[index]
+            new = self._frame_sets[index]
+        else:
+            if index is None:
+                new = frozenset(artists)
+            else:
+                new = self._frame_sets[index]
+            hide = self._visible_artists - new
+            show = new - self._visible_artists
+
+        # Only the artists that change need toggling.
+        for artist in hide:
+            artist.set_visible(False)
+        for artist in show:
             artist.set_visible(True)
+        self._visible_artists = new
+        self._shown_index = index
 
 class FuncAnimation(TimedAnimation):
     '''
@@ -379,9 +1249,24 @@ class FuncAnimation(TimedAnimation):
     *init_func* is a function used to draw a clear frame. If not given, the
     results of drawing from the first item in the frames sequence will be
     used.
+
+    *save_count* is the number of most recent frames whose data is kept for
+    saving movies, when the number of frames isn't known. A *headless*
+    animation is never played, so it saves the first *save_count* frames
+    of a new frame sequence instead.
+
+    *frame_store* optionally replaces the in-memory buffer of that data with
+    another container that has *append* and *__len__* methods and can be
+    iterated over, oldest first, such as a :class:`DiskFrameStore`. It is
+    responsible for how many frames it keeps.
+
+    *prefetch*, if non-zero, is the number of frames whose data is produced
+    ahead of time on a background thread, so that the work done by the
+    frames generator overlaps with drawing. The generator then must not
+    change the figure itself.
     '''
     def __init__(self, fig, func, frames=None ,init_func=None, fargs=None,
-            save_count=None, **kwargs):
+            save_count=None, frame_store=None, prefetch=0, **kwargs):
         if fargs:
             self._args = fargs
         else:
@@ -398,16 +1283,20 @@ class FuncAnimation(TimedAnimation):
         # keep counting from 0. A callable passed in for frames is assumed to
         # be a generator. An iterable will be used as is, and anything else
         # will be treated as a number of frames.
+        # Finite sequences of frames are also kept around so that frames can
+        # be looked up by number.
+        self._frames = None
         if frames is None:
-            import itertools
             self._iter_gen = itertools.count
         elif callable(frames):
             self._iter_gen = frames
         elif iterable(frames):
+            self._frames = frames
             self._iter_gen = lambda: iter(frames)
             self.save_count = len(frames)
         else:
-            self._iter_gen = lambda: iter(range(frames))
+            self._frames = range(frames)
+            self._iter_gen = lambda: iter(self._frames)
             self.save_count = frames
 
         # If we're passed in and using the default, set it to 100.
@@ -415,40 +1304,1928 @@ class FuncAnimation(TimedAnimation):
             self.save_count = 100
 
         self._init_func = init_func
-        self._save_seq = []
+
+        # The data of the last save_count frames is kept in a ring buffer,
+        # unless a frame store was given.
+        if frame_store is None:
+            frame_store = deque(maxlen=self.save_count)
+        self._save_seq = frame_store
+
+        self._prefetch = prefetch
 
         TimedAnimation.__init__(self, fig, **kwargs)
 
     def new_frame_seq(self):
-        # Use the generating function to generate a new frame sequence
-        return self._iter_gen()
+        # Use the generating function to generate a new frame sequence,
+        # possibly on a background thread.
+        return self._prefetched(self._iter_gen())
+
+    def _indexed_frame_seq(self, start):
+        return self._prefetched(TimedAnimation._indexed_frame_seq(self,
+            start))
 
     def new_saved_frame_seq(self):
-        # Generate an iterator for the sequence of saved data.
+        # Generate an iterator for the sequence of saved data. The in-memory
+        # buffer is copied, since it can't be iterated over while frames are
+        # being added; other frame stores handle that themselves. Nothing
+        # but the initial frame is ever stored when headless, so the frames
+        # are generated anew then.
+        if self._headless:
+            return itertools.islice(self._iter_gen(), self.save_count)
+        if isinstance(self._save_seq, (list, deque)):
+            return iter(list(self._save_seq))
         return iter(self._save_seq)
 
+    def _count_saved_frames(self):
+        # A generator may run out before save_count frames.
+        if self._headless:
+            return None
+        return len(self._save_seq)
+
+    def _indexed_frames(self):
+        return self._frames
+
     def _init_draw(self):
         # Initialize the drawing either using the given init_func or by
         # calling the draw function with the first item of the frame sequence.
         # For blitting, the init_func should return a sequence of modified
         # artists.
         if self._init_func is None:
-            self._draw_frame(self.new_frame_seq().next())
+            self._draw_frame(self._iter_gen().next())
         else:
             self._drawn_artists = self._init_func()
 
     def _draw_frame(self, framedata):
-        # Save the data for potential saving of movies.
-        self._save_seq.append(framedata)
-
-        # Make sure to respect save_count (keep only the last save_count around)
-        self._save_seq = self._save_seq[-self.save_count:]
+        # Save the data for potential saving of movies, unless the frame is
+        # being drawn for a movie already. The buffer only keeps the last
+        # save_count frames around.
+        if not self._saving:
+            self._save_seq.append(framedata)
 
         # Call the func with framedata and args. If blitting is desired,
         # func needs to return a sequence of any artists that were modified.
         self._drawn_artists = self._func(framedata, *self._args)
 
+class ArrayAnimation(TimedAnimation):
+    '''
+    Makes an animation of the slices of a 3D array, shown one at a time in a
+    single image, so only one frame needs to be in memory. *data* is indexed
+    along its first axis for the frames, and can be a
+    :class:`numpy.memmap` of a dataset larger than memory. Slices can also be
+    RGB(A), making *data* 4D.
+
+    The image is made with :meth:`~matplotlib.axes.Axes.imshow` in *ax*
+    (by default, the current axes of *fig*) with *image_kw* as its keyword
+    arguments. Only the first frame is seen when making it, so giving
+    *vmin* and *vmax* is recommended.
+
+    *prefetch*, if non-zero, is the number of slices read ahead on a
+    background thread, which hides the time taken reading a memory mapped
+    file.
+    '''
+    def __init__(self, fig, data, ax=None, image_kw=None, prefetch=0,
+            **kwargs):
+        self._data = data
+        self._prefetch = prefetch
+        if ax is None:
+            ax = fig.gca()
+        self.image = ax.imshow(data[0], **(image_kw or {}))
+        TimedAnimation.__init__(self, fig, **kwargs)
+
+    def _slices(self, copy, start=0, stop=None):
+        # Reading a slice of a memory mapped array only happens when it is
+        # copied, so a copy is made when reading ahead.
+        import numpy as np
+        data = self._data
+        if stop is None:
+            stop = len(data)
+        for i in xrange(start, stop):
+            if copy:
+                yield np.array(data[i])
+            else:
+                yield data[i]
+
+    def new_frame_seq(self):
+        return self._prefetched(self._slices(bool(self._prefetch)))
+
+    def _indexed_frame_seq(self, start):
+        return self._prefetched(self._slices(bool(self._prefetch), start))
+
+    def _saved_frame_range(self, start, stop):
+        # Saving reads ahead like the animation on screen does, but with an
+        # iterator of its own.
+        if not self._prefetch:
+            return self._slices(False, start, stop)
+        return _PrefetchIterator(self._slices(True, start, stop),
+            self._prefetch)
+
+    def _indexed_frames(self):
+        return self._data
+
+    def _init_draw(self):
+        self._draw_frame(self._data[0])
+
+    def _draw_frame(self, framedata):
+        self.image.set_data(framedata)
+        self._drawn_artists = [self.image]
+
+
+class _CallbackSource(object):
+    '''
+    Base class for event sources, keeping the callbacks they call. A
+    callback that returns False is removed.
+    '''
+    def __init__(self):
+        self.callbacks = []
+
+    def add_callback(self, func, *args, **kwargs):
+        '''
+        Adds *func* to be called with *args* and *kwargs* on every event.
+        '''
+        self.callbacks.append(self._new_callback(func, args, kwargs))
+
+    def remove_callback(self, func, *args, **kwargs):
+        '''
+        Removes *func*, only if called with the same *args* and *kwargs* if
+        those are given.
+        '''
+        for cb in self.callbacks:
+            if cb[0] == func and (not (args or kwargs) or
+                    (cb[1], cb[2]) == (args, kwargs)):
+                self.callbacks.remove(cb)
+                break
+
+    def _new_callback(self, func, args, kwargs):
+        # Returns the entry kept in callbacks for a new callback. Subclasses
+        # can keep more about each callback after the first three items.
+        return (func, args, kwargs)
+
+    def _call(self, cb):
+        # Calls the callback with the entry *cb*, removing it if it returns
+        # False.
+        func, args, kwargs = cb[:3]
+        if func(*args, **kwargs) == False and cb in self.callbacks:
+            self.callbacks.remove(cb)
+
+
+class _TimerSource(_CallbackSource):
+    '''
+    Base class for event sources run by a GUI timer, which calls _tick().
+    The timer is made from *fig* to fire every *interval* milliseconds,
+    unless an existing *timer* is given.
+    '''
+    def __init__(self, fig=None, interval=200, timer=None):
+        _CallbackSource.__init__(self)
+        if timer is None:
+            timer = fig.canvas.new_timer()
+            timer.interval = interval
+        self._timer = timer
+        self._timer.add_callback(self._tick)
+
+    def _get_interval(self):
+        return self._timer.interval
+
+    def _set_interval(self, interval):
+        self._timer.interval = interval
+
+    interval = property(_get_interval, _set_interval)
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _tick(self):
+        raise NotImplementedError('Needs to be implemented by subclasses.')
+
+
+class _DeferredDrawing(object):
+    '''
+    Mixin for event sources that collect the redraws and blits requested by
+    animations while the callbacks of a tick run, so that they can be
+    carried out once for each canvas afterwards. The requests are collected
+    between _start_collecting() and _stop_collecting(), and turned down
+    otherwise.
+    '''
+    _pending_draws = None
+    _pending_blits = None
+
+    def defer_draw(self, canvas):
+        '''
+        Takes over a redraw request for *canvas* made during a tick,
+        returning whether it did.
+        '''
+        if self._pending_draws is None:
+            return False
+        self._pending_draws.add(canvas)
+        return True
+
+    def defer_blit(self, canvas, bboxes):
+        '''
+        Takes over blitting the areas *bboxes* of *canvas* during a tick,
+        returning whether it did.
+        '''
+        if self._pending_blits is None:
+            return False
+        self._pending_blits.setdefault(canvas, []).extend(bboxes)
+        return True
+
+    def _start_collecting(self):
+        self._pending_draws = set()
+        self._pending_blits = {}
+
+    def _stop_collecting(self):
+        # Returns the canvases to redraw and a dict of the areas to blit for
+        # each canvas, as collected since _start_collecting().
+        pending = self._pending_draws, self._pending_blits
+        self._pending_draws = None
+        self._pending_blits = None
+        return pending
+
+
+class AnimationGroup(_TimerSource, _DeferredDrawing):
+    '''
+    An event source that drives many animations from a single timer. Pass
+    the group as the *event_source* of each animation in it.
+
+    On every tick, the group steps each animation once, with animations
+    whose figure window is shown first and then the ones that have waited
+    longest since they were last stepped. Whether a window is shown is
+    asked of the Qt, Tk, GTK and wx widgets; figures on other canvases
+    count as shown unless the figure itself was made invisible.
+
+    Redraws requested by the animations are collected and each canvas is
+    redrawn only once, after all of them have been stepped. Likewise, the
+    areas blitted by animations that use blitting are merged and flushed
+    once for each canvas.
+
+    *fig* is used to create the timer, which fires every *interval*
+    milliseconds. Alternatively, an existing *timer* can be given.
+
+    *budget* optionally limits the number of milliseconds spent stepping
+    animations in one tick. Once it is used up, the remaining animations wait
+    for the next tick, where they go first. At least one animation is stepped
+    on every tick. The number of animation steps put off this way is kept in
+    *deferred*.
+
+    As with any shared event source, changing the group's *interval* (which
+    :class:`TimedAnimation` does for *repeat_delay*) affects every animation
+    in it.
+    '''
+    def __init__(self, fig=None, interval=200, budget=None, timer=None):
+        _TimerSource.__init__(self, fig, interval, timer)
+        self.budget = budget
+        self.deferred = 0
+
+    def _new_callback(self, func, args, kwargs):
+        # Each callback is kept as [func, args, kwargs, time last called].
+        return [func, args, kwargs, 0.]
+
+    def _priority(self, cb):
+        # Animations on shown figures go first, then the ones that have
+        # waited the longest.
+        anim = getattr(cb[0], 'im_self', None)
+        fig = getattr(anim, '_fig', None)
+        hidden = fig is not None and not _figure_shown(fig)
+        return (hidden, cb[3])
+
+    def _tick(self):
+        start = time.time()
+        stepped = 0
+        self._start_collecting()
+        try:
+            for cb in sorted(self.callbacks, key=self._priority):
+                # Skip callbacks removed by the ones that were called already.
+                if cb not in self.callbacks:
+                    continue
+                now = time.time()
+                if (self.budget is not None and stepped and
+                        (now - start) * 1000. > self.budget):
+                    self.deferred += 1
+                    continue
+                stepped += 1
+                cb[3] = now
+                self._call(cb)
+        finally:
+            canvases, blits = self._stop_collecting()
+        _flush_pending(canvases, blits)
+
+
+def _figure_shown(fig):
+    # Returns whether *fig* is in a window that is shown on screen, as far as
+    # its canvas can tell. The GUI canvases are widgets of their toolkit,
+    # which is asked directly; any other canvas counts as shown.
+    if not fig.get_visible():
+        return False
+    canvas = fig.canvas
+    try:
+        if hasattr(canvas, 'get_tk_widget'):
+            return bool(canvas.get_tk_widget().winfo_viewable())
+        if hasattr(canvas, 'isVisible'):
+            window = canvas.window()
+            return canvas.isVisible() and not window.isMinimized()
+        if hasattr(canvas, 'IsShownOnScreen'):
+            return canvas.IsShownOnScreen()
+        if hasattr(canvas, 'get_mapped'):
+            return canvas.get_mapped()
+    except Exception:
+        # A window that is being destroyed can fail to answer.
+        return False
+    return True
+
+
+class DataEventSource(_TimerSource):
+    '''
+    Base class for event sources that only call their callbacks when new
+    data has arrived, rather than on every tick of a timer. Subclasses
+    implement :meth:`has_data`.
+
+    A GUI timer from *fig* (or the given *timer*) runs every *interval*
+    milliseconds on the GUI thread and calls :meth:`has_data`, which should
+    be a cheap check. Only when it returns True are the callbacks called,
+    so animations driven by this source only draw when there is something
+    new to show. Callbacks that return False are removed.
+    '''
+    def __init__(self, fig=None, interval=50, timer=None):
+        _TimerSource.__init__(self, fig, interval, timer)
+
+    def has_data(self):
+        '''
+        Returns whether new data has arrived since the last call.
+        '''
+        raise NotImplementedError('Needs to be implemented by subclasses.')
+
+    def _tick(self):
+        if not self.has_data():
+            return
+        for cb in list(self.callbacks):
+            self._call(cb)
+
+
+class FileEventSource(DataEventSource):
+    '''
+    Event source that calls its callbacks when the file at *path* changes,
+    such as when data is appended to it. Use it with a :class:`FileTail` to
+    animate data as it is written to a file.
+
+    On Linux, changes are picked up with inotify, so each tick only asks the
+    kernel whether there were any modifications, without touching the file.
+    Elsewhere, or if inotify can't be used, the inode, size and modification
+    time of the file are compared instead.
+
+    If the file is replaced by another one at *path*, as log rotation does,
+    the new file is watched from then on.
+
+    *fig*, *interval* and *timer* are as for :class:`DataEventSource`.
+    '''
+    # Flags from <sys/inotify.h>
+    _IN_MODIFY = 0x2
+    _IN_ATTRIB = 0x4
+    _IN_DELETE_SELF = 0x400
+    _IN_MOVE_SELF = 0x800
+    _IN_NONBLOCK = 0x800
+
+    # Besides modifications, watch for the file being moved away or deleted
+    # (which shows up as a change of its link count), to follow a rotation.
+    _WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_DELETE_SELF | _IN_MOVE_SELF
+
+    def __init__(self, path, fig=None, interval=50, timer=None):
+        DataEventSource.__init__(self, fig, interval, timer)
+        self.path = path
+        self._inotify_fd = None
+        self._watched = None
+        self._init_inotify()
+        self._last_stat = self._stat()
+
+    def _init_inotify(self):
+        # Sets up inotify and a watch on the file, leaving _inotify_fd as None
+        # if that isn't possible.
+        import os
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            inotify_init1 = libc.inotify_init1
+            self._add_watch = libc.inotify_add_watch
+            self._rm_watch = libc.inotify_rm_watch
+        except (ImportError, OSError, AttributeError):
+            return
+        fd = inotify_init1(self._IN_NONBLOCK)
+        if fd < 0:
+            return
+        self._inotify_fd = fd
+        if not self._watch():
+            os.close(fd)
+            self._inotify_fd = None
+
+    def _watch(self):
+        # Watches the file that is now at self.path instead of the one
+        # watched before, if any, returning whether that worked. _watched
+        # holds the watch descriptor and the file's inode.
+        import os
+        if self._watched is not None:
+            # This fails harmlessly if the kernel dropped the watch already,
+            # as it does for deleted files.
+            self._rm_watch(self._inotify_fd, self._watched[0])
+            self._watched = None
+        wd = self._add_watch(self._inotify_fd, self.path, self._WATCH_MASK)
+        if wd < 0:
+            return False
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        self._watched = (wd, (st.st_dev, st.st_ino))
+        return True
+
+    def _stat(self):
+        import os
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino), st.st_size, st.st_mtime
+
+    def has_data(self):
+        import os
+        import select
+        if self._inotify_fd is None:
+            st = self._stat()
+            changed = st != self._last_stat
+            self._last_stat = st
+            return changed
+
+        if self._watched is None:
+            # The file went away; it counts as changed once it's back.
+            return self._watch()
+        if not select.select([self._inotify_fd], [], [], 0)[0]:
+            return False
+        # Throw away the queued events; all that matters is that there were
+        # some. Only then is the file looked at, to see whether it was
+        # replaced.
+        try:
+            while os.read(self._inotify_fd, 4096):
+                pass
+        except OSError:
+            pass
+        st = self._stat()
+        if st is None or st[0] != self._watched[1]:
+            self._watch()
+        return True
+
+    def close(self):
+        '''
+        Stops watching the file.
+        '''
+        import os
+        self.stop()
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+
+class FileTail(object):
+    '''
+    Reads the data appended to a growing file, for animating it as it comes
+    in. The file is kept open and only the new bytes are read each time, so
+    nothing is read twice.
+
+    The file is split into lines, or into records of *record_size* bytes if
+    that is given. Each complete line or record is passed through *parser*,
+    if given, to turn it into the data for a frame; a partial line or record
+    at the end of the file is kept until the rest of it is written.
+
+    If *from_start* is False, the data already in the file is skipped. If
+    the file shrinks, it is assumed to have been truncated and is read again
+    from the start. If it is replaced by another file at *path*, as log
+    rotation does, the rest of the old file is read and then the new file
+    from its start; a partial line or record left at the end of the old file
+    is dropped.
+
+    :meth:`frames` can be used as the *frames* of a :class:`FuncAnimation`,
+    which will then get a list of the records that arrived since the
+    previous frame.
+    '''
+    def __init__(self, path, record_size=None, parser=None, from_start=True):
+        import os
+        self.path = path
+        self.record_size = record_size
+        self.parser = parser
+        self._fd = os.open(path, os.O_RDONLY)
+        self._offset = 0
+        if not from_start:
+            self._offset = os.fstat(self._fd).st_size
+        self._partial = ''
+
+    def read(self):
+        '''
+        Returns a list of the records that were completed since the last
+        call, which is empty if there are none.
+        '''
+        import os
+        records = self._split(self._read_data())
+        fd = self._reopen()
+        if fd is not None:
+            os.close(self._fd)
+            self._fd = fd
+            self._offset = 0
+            self._partial = ''
+            records.extend(self._split(self._read_data()))
+
+        if self.parser is not None:
+            records = [self.parser(r) for r in records]
+        return records
+
+    def _reopen(self):
+        # Returns a new file descriptor for self.path if that is now a
+        # different file than the one being read, or None.
+        import os
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            # Rotated away, but the new file isn't there yet.
+            return None
+        old = os.fstat(self._fd)
+        if (st.st_dev, st.st_ino) == (old.st_dev, old.st_ino):
+            return None
+        try:
+            return os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return None
+
+    def _read_data(self):
+        # Returns the bytes appended to the open file since the last read,
+        # after the partial record left over from then.
+        import os
+        size = os.fstat(self._fd).st_size
+        if size < self._offset:
+            self._offset = 0
+            self._partial = ''
+        if size == self._offset:
+            return self._partial
+
+        os.lseek(self._fd, self._offset, os.SEEK_SET)
+        chunks = [self._partial]
+        while self._offset < size:
+            chunk = os.read(self._fd, size - self._offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self._offset += len(chunk)
+        return ''.join(chunks)
+
+    def _split(self, data):
+        # Splits *data* into complete records, keeping the rest as the
+        # partial record.
+        if self.record_size is None:
+            records = data.split('\n')
+            self._partial = records.pop()
+        else:
+            end = len(data) - len(data) % self.record_size
+            records = [data[i:i + self.record_size]
+                for i in xrange(0, end, self.record_size)]
+            self._partial = data[end:]
+        return records
+
+    def frames(self):
+        '''
+        Generator that yields the result of :meth:`read` forever.
+        '''
+        while True:
+            yield self.read()
+
+    def close(self):
+        import os
+        os.close(self._fd)
+
+
+class StreamEventSource(DataEventSource):
+    '''
+    Event source that reads fixed-layout binary records from a pipe, socket
+    or subprocess and calls its callbacks when new records have arrived. Use
+    :meth:`frames` as the *frames* of a :class:`FuncAnimation` to get the
+    records.
+
+    *stream* can be a socket, a :class:`subprocess.Popen` (its stdout is
+    read), a file object or a file descriptor. It is read on a background
+    thread, so the GUI thread never blocks on I/O. *dtype* is the numpy dtype
+    of one record; the bytes are decoded in bulk with
+    :func:`numpy.frombuffer` into a preallocated ring buffer that holds
+    *capacity* records. If more than that arrive between two frames, the
+    oldest are overwritten and counted in :attr:`dropped`.
+
+    With *mode* 'batch', each frame is an array of all the records that
+    arrived since the previous frame. With *mode* 'latest', each frame is
+    only the newest record, and the rest are counted in :attr:`dropped`.
+
+    *fig*, *interval* and *timer* are as for :class:`DataEventSource`.
+    '''
+    def __init__(self, stream, dtype, fig=None, interval=50, timer=None,
+            mode='batch', capacity=4096, read_size=65536):
+        import os
+        import threading
+        import numpy as np
+
+        if mode not in ('batch', 'latest'):
+            raise ValueError("mode must be 'batch' or 'latest', not %r"
+                % (mode,))
+        DataEventSource.__init__(self, fig, interval, timer)
+        self.mode = mode
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.read_size = read_size
+        self.dropped = 0
+
+        # Work out how to read a chunk of bytes from the stream
+        if hasattr(stream, 'recv'):
+            self._read = stream.recv
+        else:
+            if hasattr(stream, 'stdout'):
+                stream = stream.stdout
+            if hasattr(stream, 'fileno'):
+                stream = stream.fileno()
+            self._read = lambda n, fd=stream: os.read(fd, n)
+
+        # The ring the reader fills and the buffer handed out for each frame.
+        # _count is the total number of records received, so the records
+        # not yet handed out are those from _taken up to _count.
+        self._ring = np.empty(capacity, dtype=self.dtype)
+        self._out = np.empty(capacity, dtype=self.dtype)
+        self._count = 0
+        self._taken = 0
+        self._lock = threading.Lock()
+        self._eof = False
+        self._eof_seen = False
+        self._error = None
+
+        self._reader = threading.Thread(target=self._read_records)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _read_records(self):
+        import numpy as np
+        size = self.dtype.itemsize
+        carry = ''
+        try:
+            while True:
+                chunk = self._read(self.read_size)
+                if not chunk:
+                    break
+                if carry:
+                    chunk = carry + chunk
+                n = len(chunk) // size
+                carry = chunk[n * size:]
+                if n:
+                    self._store(np.frombuffer(chunk, dtype=self.dtype,
+                        count=n))
+        except Exception, e:
+            self._error = e
+        self._eof = True
+
+    def _store(self, records):
+        # Only the last *capacity* records can be kept
+        n = len(records)
+        if n > self.capacity:
+            records = records[-self.capacity:]
+        with self._lock:
+            start = (self._count + n - len(records)) % self.capacity
+            first = min(len(records), self.capacity - start)
+            self._ring[start:start + first] = records[:first]
+            self._ring[:len(records) - first] = records[first:]
+            self._count += n
+            lost = self._count - self._taken - self.capacity
+            if lost > 0:
+                self.dropped += lost
+                self._taken += lost
+
+    def has_data(self):
+        if self._count > self._taken:
+            return True
+        # Let the frames generator see the end of the stream once
+        if self._eof and not self._eof_seen:
+            self._eof_seen = True
+            return True
+        return False
+
+    def read(self):
+        '''
+        Returns the records received since the last call, as described for
+        *mode*. In 'batch' mode, the array returned is reused by the next
+        call, so it must be copied if it needs to be kept.
+        '''
+        with self._lock:
+            n = self._count - self._taken
+            start = self._taken % self.capacity
+            if self.mode == 'latest':
+                self._taken = self._count
+                if not n:
+                    return None
+                self.dropped += n - 1
+                return self._ring[(self._count - 1) % self.capacity].copy()
+
+            first = min(n, self.capacity - start)
+            out = self._out[:n]
+            out[:first] = self._ring[start:start + first]
+            out[first:] = self._ring[:n - first]
+            self._taken = self._count
+        return out
+
+    def frames(self):
+        '''
+        Generator that yields the result of :meth:`read` until the stream
+        is closed. Errors from reading the stream are raised from here.
+        '''
+        while True:
+            eof = self._eof
+            data = self.read()
+            if eof and (data is None or
+                    (self.mode == 'batch' and not len(data))):
+                break
+            yield data
+        if self._error is not None:
+            raise self._error
+
+
+class StreamingLine(object):
+    '''
+    Keeps the most recent *maxlen* points of a streaming data series for
+    *line*, a :class:`~matplotlib.lines.Line2D`, so that strip charts don't
+    slow down as data keeps coming in.
+
+    The points are kept in preallocated numpy arrays. Adding a point costs
+    the same however much data there is, and :attr:`x` and :attr:`y` are
+    views of the buffers, so nothing is copied to give them to the line.
+    Each point is written twice into a buffer of twice *maxlen*, which keeps
+    the newest *maxlen* points contiguous.
+
+    If *scroll* is given, the x limits of the line's axes are moved right
+    whenever the newest point goes past the right edge, by *scroll* times
+    the width of the axes (repeatedly, if needed). Blitted animations notice
+    the change and redraw the background.
+    '''
+    def __init__(self, line, maxlen, scroll=None):
+        import numpy as np
+        self.line = line
+        self.maxlen = maxlen
+        self.scroll = scroll
+        self._x = np.empty(2 * maxlen)
+        self._y = np.empty(2 * maxlen)
+        # Index in [0, maxlen) where the next point goes, and the number of
+        # points kept.
+        self._pos = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append(self, x, y):
+        '''
+        Adds a point.
+        '''
+        pos = self._pos
+        self._x[pos] = self._x[pos + self.maxlen] = x
+        self._y[pos] = self._y[pos + self.maxlen] = y
+        self._pos = (pos + 1) % self.maxlen
+        self._len = min(self._len + 1, self.maxlen)
+
+    def extend(self, x, y):
+        '''
+        Adds the points from the sequences *x* and *y*.
+        '''
+        import numpy as np
+        x = np.asarray(x, dtype=float)[-self.maxlen:]
+        y = np.asarray(y, dtype=float)[-self.maxlen:]
+        n = len(x)
+        index = (self._pos + np.arange(n)) % self.maxlen
+        self._x[index] = self._x[index + self.maxlen] = x
+        self._y[index] = self._y[index + self.maxlen] = y
+        self._pos = (self._pos + n) % self.maxlen
+        self._len = min(self._len + n, self.maxlen)
+
+    def clear(self):
+        self._pos = 0
+        self._len = 0
+
+    def _span(self):
+        start = (self._pos - self._len) % self.maxlen
+        return slice(start, start + self._len)
+
+    @property
+    def x(self):
+        'The x values of the points kept, oldest first, as a view.'
+        return self._x[self._span()]
+
+    @property
+    def y(self):
+        'The y values of the points kept, oldest first, as a view.'
+        return self._y[self._span()]
+
+    def update(self):
+        '''
+        Sets the line's data to the points kept, scrolling the axes if
+        needed. Returns the line, for returning from a :class:`FuncAnimation`
+        function when blitting.
+        '''
+        import math
+        x = self.x
+        self.line.set_data(x, self.y)
+        if self.scroll and len(x):
+            ax = self.line.axes
+            xmin, xmax = ax.get_xlim()
+            if x[-1] > xmax:
+                step = (xmax - xmin) * self.scroll
+                shift = step * math.ceil((x[-1] - xmax) / step)
+                ax.set_xlim(xmin + shift, xmax + shift)
+        return self.line
+
+
+class ColormapLUT(object):
+    '''
+    Colormaps frames of data for the image *im* (an
+    :class:`~matplotlib.image.AxesImage`) with a precomputed lookup table,
+    instead of having the image normalize and colormap the data itself on
+    every draw.
+
+    The data is scaled to the fixed limits *vmin* and *vmax*, quantized into
+    *levels* colors from the image's colormap, and turned into RGBA with a
+    single lookup, all in buffers that are reused from frame to frame. Values
+    outside of the limits get the colormap's under and over colors, and NaNs
+    its bad color. The image's own limits are set as well, so colorbars for
+    it stay correct.
+
+    Every frame must have the same shape. For large images, also consider
+    *interpolation* 'nearest' for the image, which is the cheapest to
+    resample.
+    '''
+    # The caches of an AxesImage that have to be dropped when its array is
+    # changed in place. Images without them get their colors through
+    # set_data() instead.
+    _image_caches = ('_imcache', '_rgbacache', '_oldxslice', '_oldyslice')
+
+    def __init__(self, im, vmin, vmax, levels=256):
+        import numpy as np
+        if not vmax > vmin:
+            raise ValueError('vmax (%r) must be larger than vmin (%r)'
+                % (vmax, vmin))
+        self.im = im
+        self.vmin = float(vmin)
+        self.vmax = float(vmax)
+        self.levels = levels
+        im.set_clim(vmin, vmax)
+        self._in_place = all(hasattr(im, name) for name in self._image_caches)
+
+        # The table starts with the under color and ends with the over and
+        # bad colors, with the colormap's colors in between. Each RGBA color
+        # is looked up as a single 32 bit value.
+        cmap = im.get_cmap()
+        lut = np.empty((levels + 3, 4), dtype=np.uint8)
+        lut[0] = cmap(-1., bytes=True)
+        lut[1:levels + 1] = cmap(np.linspace(0, 1, levels), bytes=True)
+        lut[levels + 1] = cmap(2., bytes=True)
+        lut[levels + 2] = cmap(np.ma.masked_invalid([np.nan]), bytes=True)[0]
+        self._lut = lut.view(np.uint32).ravel()
+
+        # Maps vmin to 1 and vmax to levels + 1, past the under color
+        self._scale = levels / (self.vmax - self.vmin)
+        self._offset = 1 - self.vmin * self._scale
+
+        self._shape = None
+        self._array = None
+
+    def _allocate(self, shape):
+        import numpy as np
+        self._shape = shape
+        self._scaled = np.empty(shape, dtype=float)
+        # The indices could be much smaller integers, but numpy.take converts
+        # any other type to intp, in a new array, on every call.
+        self._index = np.empty(shape, dtype=np.intp)
+        self._top = np.empty(shape, dtype=bool)
+        self._nan = np.empty(shape, dtype=bool)
+        self._array = None
+        if not self._in_place:
+            self._colors = np.empty(shape + (4,), dtype=np.uint8)
+            self._rgba = self._colors.view(np.uint32).reshape(shape)
+
+    def update(self, data):
+        '''
+        Shows the 2D array *data* in the image. Returns the image, for
+        returning from a :class:`FuncAnimation` function when blitting.
+        '''
+        import numpy as np
+        data = np.asarray(data)
+        if data.shape != self._shape:
+            self._allocate(data.shape)
+
+        # Work out the table index of each value. Everything is shifted to
+        # be positive first, so that casting truncates like floor would.
+        scaled = self._scaled
+        np.multiply(data, self._scale, out=scaled)
+        np.add(scaled, self._offset, out=scaled)
+        np.clip(scaled, 0, self.levels + 1, out=scaled)
+        index = self._index
+        np.copyto(index, scaled, casting='unsafe')
+        # Exactly vmax belongs with the top color, not the over color
+        np.equal(data, self.vmax, out=self._top)
+        np.copyto(index, self.levels, where=self._top)
+        np.isnan(data, out=self._nan)
+        np.copyto(index, self.levels + 2, where=self._nan)
+
+        # set_data() copies the array and checks it for invalid values, which
+        # costs more than everything above. So it is only used to give the
+        # image an RGBA array of the right shape, and after that the colors
+        # are written straight into the image's copy and its caches dropped.
+        # Without those caches to drop, the colors are made in a buffer of
+        # our own and handed to set_data() every time.
+        im = self.im
+        if not self._in_place:
+            np.take(self._lut, index, out=self._rgba, mode='clip')
+            im.set_data(self._colors)
+            return im
+        if im.get_array() is not self._array:
+            im.set_data(np.zeros(self._shape + (4,), dtype=np.uint8))
+            self._array = im.get_array()
+            self._rgba = np.ma.getdata(self._array).view(
+                np.uint32).reshape(self._shape)
+        np.take(self._lut, index, out=self._rgba, mode='clip')
+        for name in self._image_caches:
+            setattr(im, name, None)
+        im.stale = True
+        return im
+
+
+def headless_figure(*args, **kwargs):
+    '''
+    Creates a :class:`~matplotlib.figure.Figure` with an Agg canvas, without
+    going through pyplot, so that it isn't tracked by pyplot or tied to a GUI
+    backend. The arguments are passed on to the Figure.
+    '''
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(*args, **kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _import_asyncio():
+    # asyncio is only in the standard library from Python 3.4; trollius is
+    # the backport for older versions.
+    try:
+        import asyncio
+    except ImportError:
+        import trollius as asyncio
+    return asyncio
+
+
+class AsyncioEventSource(_CallbackSource, _DeferredDrawing):
+    '''
+    Event source driven by an asyncio event loop instead of a GUI timer, so
+    that animations can be run inside asyncio applications and many of them
+    can share one loop without threads.
+
+    The callbacks are called every *interval* milliseconds on *loop* (the
+    current event loop by default). The ticks are scheduled against the
+    loop's clock, so the rate doesn't drift when callbacks are slow.
+
+    Redraws requested by the animations during a tick are collected, and
+    each canvas is drawn once after all the callbacks have run, by calling
+    *on_tick* with the set of canvases if it is given, or their draw_idle()
+    otherwise.
+
+    :attr:`finished` is a future that is resolved once no callbacks are
+    left, such as when a non-repeating animation reaches its last frame.
+    '''
+    def __init__(self, interval=200, loop=None, on_tick=None):
+        asyncio = _import_asyncio()
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        _CallbackSource.__init__(self)
+        self.loop = loop
+        self.interval = interval
+        self.on_tick = on_tick
+        self._handle = None
+        self._next_time = None
+        create_future = getattr(loop, 'create_future', None)
+        if create_future is not None:
+            self.finished = create_future()
+        else:
+            self.finished = asyncio.Future(loop=loop)
+
+    def start(self):
+        if self._handle is None:
+            self._next_time = self.loop.time()
+            self._schedule()
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self):
+        # The interval may have been changed by the callbacks (as
+        # TimedAnimation does for its repeat delay), so it is read every time.
+        self._next_time += self.interval / 1000.
+        now = self.loop.time()
+        if self._next_time < now:
+            self._next_time = now
+        self._handle = self.loop.call_at(self._next_time, self._tick)
+
+    def _tick(self):
+        self._handle = None
+        self._start_collecting()
+        try:
+            for cb in list(self.callbacks):
+                self._call(cb)
+        except Exception, e:
+            self._stop_collecting()
+            if not self.finished.done():
+                self.finished.set_exception(e)
+            return
+        canvases, blits = self._stop_collecting()
+
+        if self.on_tick is not None:
+            _flush_pending(set(), blits)
+            self.on_tick(canvases)
+        else:
+            _flush_pending(canvases, blits)
+
+        if self.callbacks:
+            self._schedule()
+        elif not self.finished.done():
+            self.finished.set_result(None)
+
+
+def run_async(anim, loop=None, frame_callback=None):
+    '''
+    Runs *anim* on an asyncio event loop, without a GUI, and returns a future
+    that is resolved when the animation has shown its last frame (it never is
+    for a repeating animation, but it can be cancelled). The animation must
+    have been created with an :class:`AsyncioEventSource`.
+
+    If *frame_callback* is given, it is called with the RGBA pixel data of
+    each frame after it is rendered. The data is only valid until the
+    callback returns.
+    '''
+    source = anim.event_source
+    if not isinstance(source, AsyncioEventSource):
+        raise ValueError('The animation needs an AsyncioEventSource, not %r'
+            % (source,))
+    if loop is not None and loop is not source.loop:
+        raise ValueError('The animation uses a different event loop')
+
+    if frame_callback is not None:
+        # Frames are grabbed only after a step actually drew one, and the
+        # grab doubles as the redraw for the animation's canvas. Blitted
+        # frames are already in the renderer's buffer.
+        state = {'frame': anim._frame_number}
+        def on_tick(canvases):
+            canvas = anim._fig.canvas
+            for c in canvases:
+                if c is not canvas:
+                    c.draw_idle()
+            if anim._frame_number == state['frame']:
+                return
+            state['frame'] = anim._frame_number
+            if anim._blit and canvas not in canvases:
+                frame_callback(canvas.buffer_rgba())
+            else:
+                frame_callback(anim._grab_frame())
+        source.on_tick = on_tick
+
+    # Without a GUI there won't be a draw event to start the animation.
+    if anim._step not in [cb[0] for cb in source.callbacks]:
+        anim._start()
+    return source.finished
+
+
+class DiskFrameStore(object):
+    '''
+    Keeps the data of the most recent *maxlen* frames in files on disk rather
+    than in memory, for use as the *frame_store* of a :class:`FuncAnimation`
+    that streams live data for a long time.
+
+    Frames are pickled into chunk files of *chunk_size* frames each in
+    *directory*, which defaults to a new temporary directory. A chunk file is
+    deleted once all of its frames have fallen out of the last *maxlen*, so
+    only up to one extra chunk is ever kept on disk. Iterating reads the
+    chunks back one frame at a time.
+    '''
+    def __init__(self, maxlen, chunk_size=256, directory=None):
+        import tempfile
+        self.maxlen = maxlen
+        self.chunk_size = chunk_size
+        self._own_directory = directory is None
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='animation_frames')
+        self.directory = directory
+        self._count = 0
+        self._chunk_file = None
+
+    def _chunk_name(self, chunk):
+        import os
+        return os.path.join(self.directory, 'chunk%08d.pkl' % chunk)
+
+    def _first(self):
+        # Number of the oldest frame that is kept.
+        return max(0, self._count - self.maxlen)
+
+    def append(self, framedata):
+        import os
+        import cPickle
+        if self._count % self.chunk_size == 0:
+            if self._chunk_file is not None:
+                self._chunk_file.close()
+            self._chunk_file = open(
+                self._chunk_name(self._count // self.chunk_size), 'wb')
+        cPickle.dump(framedata, self._chunk_file, cPickle.HIGHEST_PROTOCOL)
+        self._count += 1
+
+        # Remove the chunk that just fell out of the window, if any.
+        old_chunk = self._first() // self.chunk_size - 1
+        if old_chunk >= 0 and (self._first() % self.chunk_size == 0):
+            try:
+                os.remove(self._chunk_name(old_chunk))
+            except OSError:
+                pass
+
+    def __len__(self):
+        return self._count - self._first()
+
+    def __iter__(self):
+        # The frames kept when iteration starts are read back in order. A
+        # chunk deleted by appending more frames ends the iteration early.
+        import cPickle
+        if self._chunk_file is not None:
+            self._chunk_file.flush()
+        first, stop = self._first(), self._count
+        chunk = first // self.chunk_size
+        index = chunk * self.chunk_size
+        while index < stop:
+            try:
+                chunk_file = open(self._chunk_name(chunk), 'rb')
+            except IOError:
+                return
+            try:
+                while index < stop and index < (chunk + 1) * self.chunk_size:
+                    framedata = cPickle.load(chunk_file)
+                    if index >= first:
+                        yield framedata
+                    index += 1
+            finally:
+                chunk_file.close()
+            chunk += 1
+
+    def clear(self):
+        '''
+        Removes all of the frames.
+        '''
+        import os
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+            self._chunk_file = None
+        for name in os.listdir(self.directory):
+            if name.startswith('chunk') and name.endswith('.pkl'):
+                os.remove(os.path.join(self.directory, name))
+        self._count = 0
+
+    def close(self):
+        '''
+        Removes all of the frames, and the directory if it was created by
+        the store.
+        '''
+        import os
+        self.clear()
+        if self._own_directory:
+            os.rmdir(self.directory)
+
+
+class FrameStats(object):
+    '''
+    Collects timings of the stages of drawing the frames of an animation.
+    Every :class:`Animation` keeps one as its *stats* attribute.
+
+    The stages are *frame_seq* (getting the next frame's data), *pre_draw*
+    (including clearing the blitted background), *draw_frame* (the drawing
+    of the frame itself, e.g. the user's function in :class:`FuncAnimation`),
+    *post_draw* (blitting or requesting a redraw of the figure),
+    *save_frame* (rendering and grabbing each frame of a saved movie), and
+    *replay* (restoring a frame from the replay cache of a
+    :class:`TimedAnimation`).
+
+    *window* is the number of recent timings kept for each stage.
+
+    *interval* is the number of milliseconds expected between frames, which
+    is filled in by :class:`TimedAnimation`. A tick that comes more than
+    *late_tolerance* times the interval later than expected counts as late.
+    '''
+    stages = ('frame_seq', 'pre_draw', 'draw_frame', 'post_draw', 'save_frame',
+        'replay')
+
+    def __init__(self, window=500, interval=None, late_tolerance=0.5):
+        self.window = window
+        self.interval = interval
+        self.late_tolerance = late_tolerance
+        self.late_ticks = 0
+        self._timings = dict((stage, deque(maxlen=window))
+            for stage in self.stages)
+        self._ticks = deque(maxlen=window)
+        self._last_tick = None
+
+    def record(self, stage, seconds):
+        '''
+        Adds a timing of *seconds* for *stage*.
+        '''
+        self._timings[stage].append(seconds)
+
+    def tick(self):
+        '''
+        Notes the start of a new frame, counting it as late if needed. Returns
+        the current time.
+        '''
+        now = time.time()
+        self._ticks.append(now)
+        last = self._last_tick
+        if last is not None and self.interval:
+            limit = self.interval * (1 + self.late_tolerance) / 1000.
+            if now - last > limit:
+                self.late_ticks += 1
+        self._last_tick = now
+        return now
+
+    def reset_tick(self):
+        '''
+        Forgets the previous tick, so that an intentional pause isn't counted
+        as a late tick.
+        '''
+        self._last_tick = None
+
+    @property
+    def achieved_fps(self):
+        'Frames per second achieved over the recent ticks.'
+        if len(self._ticks) < 2:
+            return 0.0
+        span = self._ticks[-1] - self._ticks[0]
+        if span <= 0:
+            return 0.0
+        return (len(self._ticks) - 1) / span
+
+    @property
+    def target_fps(self):
+        'Frames per second asked for by the interval, or None.'
+        if not self.interval:
+            return None
+        return 1000. / self.interval
+
+    def summary(self):
+        '''
+        Returns a dictionary mapping each stage to a dictionary with the
+        *count* of recent timings and their *mean*, *p50* and *p99*, all in
+        milliseconds. Stages without timings are left out.
+        '''
+        summary = {}
+        for stage in self.stages:
+            timings = sorted(self._timings[stage])
+            if not timings:
+                continue
+            count = len(timings)
+            summary[stage] = dict(count=count,
+                mean=1000. * sum(timings) / count,
+                p50=1000. * timings[int(0.5 * (count - 1))],
+                p99=1000. * timings[int(0.99 * (count - 1))])
+        return summary
+
+    def clear(self):
+        '''
+        Throws away all timings and counts.
+        '''
+        for timings in self._timings.values():
+            timings.clear()
+        self._ticks.clear()
+        self._last_tick = None
+        self.late_ticks = 0
+
+
+class _ReplayCache(object):
+    '''
+    Least recently used cache of the rendered pixels of frames, keyed by
+    frame number and kept within a budget of *max_bytes*.
+
+    Each frame is a list of (bbox, region) pairs, tagged with the *state*
+    (such as the figure size) it was captured in. Asking for a frame in a
+    different state throws away the whole cache, since none of it is valid.
+
+    Frames only push others out of the cache while recording the first pass
+    after the cache was (re)started; after that, new frames only fill free
+    space. Otherwise a loop that doesn't fit would evict each frame just
+    before it is needed again.
+    '''
+    def __init__(self, max_bytes):
+        from collections import OrderedDict
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.recording = True
+        self._frames = OrderedDict()
+        self._state = None
+
+    def get(self, key, state):
+        if state != self._state:
+            self.clear()
+            self._state = state
+            return None
+        entry = self._frames.pop(key, None)
+        if entry is None:
+            return None
+        self._frames[key] = entry
+        return entry[0]
+
+    def put(self, key, state, regions, nbytes):
+        if state != self._state:
+            self.clear()
+            self._state = state
+        if nbytes > self.max_bytes:
+            return
+        if not self.recording and self.nbytes + nbytes > self.max_bytes:
+            return
+        old = self._frames.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        while self.nbytes + nbytes > self.max_bytes:
+            self.nbytes -= self._frames.popitem(last=False)[1][1]
+        self._frames[key] = (regions, nbytes)
+        self.nbytes += nbytes
+
+    def end_pass(self):
+        self.recording = False
+
+    def clear(self):
+        self._frames.clear()
+        self.nbytes = 0
+        self.recording = True
+
+
+class SaveCancelled(Exception):
+    '''
+    Raised by :meth:`SaveProgress.result` when the save was cancelled.
+    '''
+    pass
+
+
+class SaveProgress(object):
+    '''
+    Tracks a movie being saved in the background by
+    :meth:`Animation.save_async`, in the manner of a future.
+
+    *frames_done* and *total_frames* give the number of frames written so far
+    and in all; *total_frames* is None if the number of frames isn't known
+    until they have all been drawn. :attr:`fps` and :attr:`eta` give the rate
+    at which frames are being written and the estimated number of seconds
+    until they all are.
+    Once they are, :attr:`encoding` is True while the movie program
+    finishes the movie, which takes a time that can't be estimated.
+
+    :meth:`cancel` stops the save, removing any temporary image files and
+    stopping the movie program; :meth:`result` waits for the save to finish.
+    '''
+    def __init__(self, total_frames):
+        import threading
+        self.total_frames = total_frames
+        self.frames_done = 0
+        self.encoding = False
+        self._start_time = time.time()
+        self._frames_end_time = None
+        self._end_time = None
+        self._cancel_event = threading.Event()
+        self._cancelled = False
+        self._exception = None
+        self._finished = threading.Event()
+
+    @property
+    def elapsed(self):
+        'Number of seconds spent saving so far.'
+        end = self._end_time
+        if end is None:
+            end = time.time()
+        return end - self._start_time
+
+    @property
+    def fps(self):
+        'Number of frames written per second.'
+        end = self._frames_end_time or self._end_time or time.time()
+        elapsed = end - self._start_time
+        if elapsed <= 0:
+            return 0.0
+        return self.frames_done / elapsed
+
+    @property
+    def eta(self):
+        '''
+        Estimated number of seconds until all frames are written, or None if
+        no frames have been written yet or the number of frames isn't known.
+        Once they all are, this is 0.
+        '''
+        if self.done() or self._frames_end_time is not None:
+            return 0.0
+        fps = self.fps
+        if not fps or self.total_frames is None:
+            return None
+        return (self.total_frames - self.frames_done) / fps
+
+    def cancel(self):
+        '''
+        Requests that the save stop after the frame being drawn, or stops the
+        movie program if all the frames have been written. Returns False if
+        the save had already finished.
+        '''
+        if self.done():
+            return False
+        self._cancel_event.set()
+        return True
+
+    def cancelled(self):
+        'Returns whether the save was cancelled.'
+        return self._cancelled
+
+    def done(self):
+        'Returns whether the save has finished, failed or been cancelled.'
+        return self._finished.is_set()
+
+    def running(self):
+        'Returns whether the save is still in progress.'
+        return not self.done()
+
+    def result(self, timeout=None):
+        '''
+        Waits up to *timeout* seconds for the save to finish. Raises the error
+        that stopped the save, :class:`SaveCancelled` if it was cancelled, or
+        RuntimeError if it is still running after the timeout.
+        '''
+        self._finished.wait(timeout)
+        if not self.done():
+            raise RuntimeError('Saving the movie has not finished.')
+        if self._cancelled:
+            raise SaveCancelled()
+        if self._exception is not None:
+            raise self._exception
+
+    def exception(self, timeout=None):
+        '''
+        Waits up to *timeout* seconds for the save to finish and returns the
+        error that stopped it, if any.
+        '''
+        self._finished.wait(timeout)
+        return self._exception
+
+    def _frame_done(self):
+        # Called by the saving code after every frame.
+        self.frames_done += 1
+        if self._cancel_event.is_set():
+            raise SaveCancelled()
+
+    def _encoding_started(self):
+        # Called by the saving code once all frames have been handed to the
+        # movie program.
+        self._frames_end_time = time.time()
+        self.encoding = True
+        if self._cancel_event.is_set():
+            raise SaveCancelled()
+
+    def _run(self, filename, save_func, *args):
+        # Body of the background thread. A partially written movie is removed
+        # when the save is cancelled.
+        import os
+        try:
+            save_func(progress=self, *args)
+        except SaveCancelled:
+            self._cancelled = True
+            if os.path.exists(filename):
+                os.remove(filename)
+        except Exception, e:
+            self._exception = e
+        self.encoding = False
+        self._end_time = time.time()
+        self._finished.set()
+
+
+def _overlaps(a, b):
+    # Returns whether the boxes *a* and *b* share any area.
+    from matplotlib.transforms import Bbox
+    overlap = Bbox.intersection(a, b)
+    return overlap is not None and overlap.width > 0 and overlap.height > 0
+
+def _merge_bboxes(bboxes, slack=0.25):
+    # Merges the boxes in *bboxes* (in display coordinates) into fewer,
+    # larger ones for blitting. Two boxes are merged into the box around
+    # both when that isn't more than *slack* larger than the two of them
+    # together, which is always the case for boxes that overlap or touch.
+    # Every point in the original boxes is in one of those returned.
+    from matplotlib.transforms import Bbox
+    boxes = [tuple(b.extents) for b in bboxes if b.width > 0 and b.height > 0]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            area = (box[2] - box[0]) * (box[3] - box[1])
+            for i, other in enumerate(result):
+                union = (min(box[0], other[0]), min(box[1], other[1]),
+                    max(box[2], other[2]), max(box[3], other[3]))
+                touching = (box[0] <= other[2] and other[0] <= box[2] and
+                    box[1] <= other[3] and other[1] <= box[3])
+                total = area + (other[2] - other[0]) * (other[3] - other[1])
+                if touching or ((union[2] - union[0]) * (union[3] - union[1])
+                        <= (1 + slack) * total):
+                    result[i] = union
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return [Bbox.from_extents(*box) for box in boxes]
+
+def _flush_pending(canvases, blits):
+    # Carries out the blits and redraws collected by an event source over a
+    # tick: the merged areas in *blits* (a dict of canvas to bboxes) and a
+    # redraw of each of *canvases*.
+    for canvas, bboxes in blits.iteritems():
+        for bbox in _merge_bboxes(bboxes):
+            canvas.blit(bbox)
+    for canvas in canvases:
+        canvas.draw_idle()
+
+# The type of the iterators made by itertools.tee, which can be copied
+_tee_type = type(itertools.tee(())[0])
+
+class _PrefetchIterator(object):
+    '''
+    Iterates over *iterator* on a background thread, keeping up to *maxsize*
+    items ready ahead of the consumer. Exceptions raised by *iterator* are
+    raised again from :meth:`next` in the consumer's thread.
+    '''
+    _done = object()
+
+    def __init__(self, iterator, maxsize):
+        import threading
+        from Queue import Queue
+        self._iterator = iterator
+        self._queue = Queue(maxsize)
+        self._closed = False
+        self._finished = False
+        self._thread = threading.Thread(target=self._produce)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __iter__(self):
+        return self
+
+    def _produce(self):
+        import sys
+        # Each item is queued along with any exception info, which ends the
+        # sequence as well.
+        try:
+            for item in self._iterator:
+                self._queue.put((item, None))
+                if self._closed:
+                    return
+            self._queue.put((self._done, None))
+        except Exception:
+            self._queue.put((self._done, sys.exc_info()))
+
+    def next(self):
+        if self._finished:
+            raise StopIteration
+        item, exc_info = self._queue.get()
+        if item is self._done:
+            self._finished = True
+            if exc_info is not None:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            raise StopIteration
+        return item
+
+    def close(self):
+        '''
+        Stops the background thread once it has finished the item it is
+        working on.
+        '''
+        from Queue import Empty
+        self._closed = True
+        self._finished = True
+        # Make room, so that a producer blocked on a full queue wakes up and
+        # sees it has been closed.
+        try:
+            while True:
+                self._queue.get_nowait()
+        except Empty:
+            pass
+
+
+class _FramePipe(object):
+    '''
+    Writes frames into the stdin of a movie program from a background thread.
+
+    *proc* is the :class:`subprocess.Popen` instance of the movie program,
+    with stdin, stdout and stderr all connected to pipes.
+
+    *maxsize* is the number of frames that can be queued before :meth:`write`
+    blocks, so that memory use stays bounded if encoding falls behind.
+
+    If the :class:`threading.Event` *cancel_event* is set while
+    :meth:`write` or :meth:`close` is waiting on the program, they raise
+    :exc:`SaveCancelled`, after which the caller should :meth:`abort`.
+    '''
+    def __init__(self, proc, maxsize=8, cancel_event=None):
+        import threading
+        from Queue import Queue
+        self._proc = proc
+        self._queue = Queue(maxsize)
+        self._cancel_event = cancel_event
+        self._error = None
+
+        # Keep the tail of the program's error output for reporting failures.
+        # Both output pipes are drained continuously, since a program that
+        # fills one of them would otherwise block and stop reading frames.
+        self._stderr = deque(maxlen=20)
+        self._threads = [threading.Thread(target=self._write_frames),
+            threading.Thread(target=self._drain, args=(proc.stdout, None)),
+            threading.Thread(target=self._drain,
+                args=(proc.stderr, self._stderr))]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def write(self, frame):
+        # Queue up a frame, blocking while the queue is full.
+        if self._error is not None:
+            raise self._error_info()
+        self._put(frame)
+
+    def close(self):
+        # Waits for all of the queued frames to be written and the program to
+        # finish, raising an error if either of those failed.
+        self._put(None)
+        if self._cancel_event is not None:
+            while self._proc.poll() is None:
+                if self._cancel_event.wait(0.1):
+                    raise SaveCancelled()
+        for thread in self._threads:
+            thread.join()
+        if self._error is not None or self._proc.wait() != 0:
+            raise self._error_info()
+
+    def abort(self):
+        # Stops the program without waiting for the queued frames. The
+        # background threads are left to finish on their own once the pipes
+        # close, which can take a while if the program left children behind.
+        from Queue import Full, Empty
+        _kill(self._proc)
+        self._error = IOError('Movie writing was aborted.')
+        while True:
+            try:
+                self._queue.put_nowait(None)
+                break
+            except Full:
+                try:
+                    self._queue.get_nowait()
+                except Empty:
+                    pass
+
+    def _put(self, item):
+        # Queues *item*, checking for cancellation while the queue is full.
+        from Queue import Full
+        if self._cancel_event is None:
+            self._queue.put(item)
+            return
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except Full:
+                if self._cancel_event.is_set():
+                    raise SaveCancelled()
+
+    def _write_frames(self):
+        # Writer thread. Once writing has failed, keep consuming frames so
+        # that the producer never blocks on a full queue.
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error is None:
+                try:
+                    self._proc.stdin.write(frame)
+                except (IOError, OSError), e:
+                    self._error = e
+        try:
+            self._proc.stdin.close()
+        except (IOError, OSError):
+            pass
+
+    def _drain(self, pipe, lines):
+        _drain_pipe(pipe, lines)
+
+    def _error_info(self):
+        return RuntimeError('Movie program failed (%s): %s' % (
+            self._error or 'exit status %d' % self._proc.returncode,
+            _error_tail(self._stderr)))
+
+
+def _drain_pipe(pipe, lines):
+    # Reads *pipe* until it is closed, keeping the lines read in *lines*
+    # (such as a bounded deque) unless that is None.
+    for line in iter(pipe.readline, ''):
+        if lines is not None:
+            lines.append(line)
+    pipe.close()
+
+def _kill(proc):
+    # Kills the process *proc*, which may have exited already, and waits for
+    # it.
+    try:
+        proc.kill()
+    except OSError:
+        pass
+    proc.wait()
+
+def _error_tail(lines, size=2000):
+    # Returns the end of the error output kept in *lines*, for messages.
+    return ''.join(lines).strip()[-size:]
+
+def _run_movie_program(cmd, progress=None):
+    # Runs the movie program *cmd* and waits for it to finish, raising a
+    # RuntimeError with the end of its error output if it fails. Its output
+    # is drained on background threads the whole time, since a program that
+    # fills one of its output pipes would otherwise block forever. If the
+    # SaveProgress *progress* is cancelled meanwhile, the program is killed
+    # and SaveCancelled raised.
+    import threading
+    from subprocess import Popen, PIPE
+    proc = Popen(cmd, shell=False, stdout=PIPE, stderr=PIPE)
+    stderr = deque(maxlen=20)
+    threads = [threading.Thread(target=_drain_pipe, args=(proc.stdout, None)),
+        threading.Thread(target=_drain_pipe, args=(proc.stderr, stderr))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    if progress is None:
+        proc.wait()
+    else:
+        while proc.poll() is None:
+            if progress._cancel_event.wait(0.1):
+                _kill(proc)
+                raise SaveCancelled()
+    for thread in threads:
+        thread.join()
+    if proc.returncode != 0:
+        raise RuntimeError('Movie program failed (exit status %d): %s' % (
+            proc.returncode, _error_tail(stderr)))
+
+def _save_segment(args):
+    # Worker process entry point for Animation.save with multiple workers.
+    # Rebuilds the animation from its factory and saves a contiguous range of
+    # its frames as a movie segment, returning the segment's file name.
+    (factory, start, stop, fname, fps, codec, clear_temp, frame_prefix,
+        stream) = args
+    anim = factory()
+    anim._save_frames(anim._saved_frame_range(start, stop), fname, fps,
+        codec, clear_temp, frame_prefix, stream)
+    return fname
+
+def render_jobs(jobs, processes=None, fps=5, codec='mpeg4', stream=False):
+    '''
+    Saves many animations as movies in parallel, using a pool of
+    *processes* worker processes (by default, one per core). Each job runs in
+    a fresh process, so jobs can't affect each other through pyplot or other
+    global state, and a job that fails doesn't stop the rest.
+
+    Each of *jobs* is a dict with these keys:
+
+      *factory*
+        the callable that builds the animation, or a ``'module:callable'``
+        string naming it. The animation is built in the worker process, so
+        the callable must be importable there. Making the animation with
+        *headless* set avoids loading a GUI in the workers.
+
+      *output*
+        the movie file name
+
+      *args*, *kwargs*
+        optional arguments for the factory
+
+      *fps*, *codec*, *stream*
+        optional overrides of the arguments of the same name, which are
+        passed on to :meth:`Animation.save`.
+
+    Returns a list with a dict for each job, in the same order, giving the
+    *output*, whether it was *ok*, the *seconds* it took, and the *error* if
+    it failed.
+    '''
+    from multiprocessing import Pool
+    tasks = []
+    for i, job in enumerate(jobs):
+        job = dict(job)
+        job.setdefault('fps', fps)
+        job.setdefault('codec', codec)
+        job.setdefault('stream', stream)
+        # Temporary frame files are written to the current directory, so
+        # every job needs its own prefix.
+        job['frame_prefix'] = '_tmp_job%04d_' % i
+        tasks.append((i, job))
+
+    pool = Pool(processes, maxtasksperchild=1)
+    try:
+        results = dict(pool.imap_unordered(_render_job, tasks))
+    finally:
+        pool.close()
+        pool.join()
+    return [results[i] for i in range(len(tasks))]
+
+def _load_factory(spec):
+    # Returns the callable named by a 'module:callable' spec, where the
+    # callable may be a dotted path within the module.
+    if callable(spec):
+        return spec
+    modname, sep, name = spec.partition(':')
+    if not sep or not name:
+        raise ValueError("Factory spec must look like 'module:callable', "
+            "not %r" % (spec,))
+    obj = __import__(modname, fromlist=['__name__'])
+    for attr in name.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+def _render_job(task):
+    # Worker process entry point for render_jobs. Any error is reported in
+    # the result instead of being raised, to keep it from taking down the
+    # other jobs.
+    import traceback
+    index, job = task
+    result = dict(output=job['output'], ok=False, error=None)
+    start = time.time()
+    try:
+        factory = _load_factory(job['factory'])
+        anim = factory(*job.get('args', ()), **job.get('kwargs', {}))
+        anim.save(job['output'], fps=job['fps'], codec=job['codec'],
+            frame_prefix=job['frame_prefix'], stream=job['stream'])
+        result['ok'] = True
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['seconds'] = time.time() - start
+    return index, result
+
+def _render_main(argv):
+    # Command line interface for render_jobs, run as
+    # python -m animation render [options] module:callable[=output] ...
+    import json
+    import sys
+    from optparse import OptionParser
+    parser = OptionParser(usage='python -m animation render [options] '
+        'module:callable[=output] ...',
+        description='Saves the animations made by the given factories as '
+        'movies, in parallel.')
+    parser.add_option('-j', '--jobs-file', help='JSON file with a list of '
+        'jobs, each an object with factory and output, and optionally args, '
+        'kwargs, fps, codec and stream')
+    parser.add_option('-p', '--processes', type='int', default=None,
+        help='number of worker processes [default: number of cores]')
+    parser.add_option('--fps', type='int', default=5,
+        help='default frames per second [default: %default]')
+    parser.add_option('--codec', default='mpeg4',
+        help='default codec [default: %default]')
+    parser.add_option('--stream', action='store_true', default=False,
+        help='pipe frames to the encoder instead of writing image files')
+    opts, args = parser.parse_args(argv)
+
+    jobs = []
+    if opts.jobs_file:
+        with open(opts.jobs_file) as f:
+            jobs.extend(json.load(f))
+    for arg in args:
+        spec, sep, output = arg.partition('=')
+        if not sep:
+            output = spec.rpartition(':')[2] + '.mp4'
+        jobs.append(dict(factory=spec, output=output))
+    if not jobs:
+        parser.error('no animations given')
+
+    start = time.time()
+    results = render_jobs(jobs, opts.processes, opts.fps, opts.codec,
+        opts.stream)
+    elapsed = time.time() - start
+
+    failed = [r for r in results if not r['ok']]
+    for r in failed:
+        print >>sys.stderr, '%s failed:\n%s' % (r['output'], r['error'])
+    for r in results:
+        print '%-40s %8.2fs  %s' % (r['output'], r['seconds'],
+            'ok' if r['ok'] else 'FAILED')
+    print '%d jobs, %d failed, %.2fs of work in %.2fs' % (len(results),
+        len(failed), sum(r['seconds'] for r in results), elapsed)
+    return 1 if failed else 0
+
 if __name__ == '__main__':
+    import sys
+    if sys.argv[1:2] == ['render']:
+        sys.exit(_render_main(sys.argv[2:]))
+
     import numpy as np
     import matplotlib.pyplot as plt
 
@@ -0,0 +1,415 @@
+#!/usr/bin/env python
+"""
+Headless benchmarks for the animation module.
+
+Every workload is modelled on one of the examples and is run under the Agg
+backend, with a fake event source that is fired as fast as possible instead
+of a GUI timer. Each workload runs in its own process so that its peak memory
+use can be measured, with and without blitting where the example supports
+it. Results are written as JSON, so that runs on different commits can be
+compared:
+
+    python benchmark.py -n 200 -o before.json
+"""
+import matplotlib
+matplotlib.use('Agg')
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
+
+from animation import (ArtistAnimation, FuncAnimation, StreamingLine,
+    TimedAnimation)
+
+
+class FakeEventSource(object):
+    '''
+    Event source that never fires on its own. Calling :meth:`fire` runs the
+    callbacks once, removing those that return False, just like a timer.
+    '''
+    def __init__(self, interval=10):
+        self.interval = interval
+        self.callbacks = []
+
+    def add_callback(self, func, *args, **kwargs):
+        self.callbacks.append((func, args, kwargs))
+
+    def remove_callback(self, func, *args, **kwargs):
+        self.callbacks = [cb for cb in self.callbacks if cb[0] != func]
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def fire(self):
+        for cb in list(self.callbacks):
+            func, args, kwargs = cb
+            if func(*args, **kwargs) == False:
+                self.callbacks.remove(cb)
+
+
+def strip_chart(blit, source):
+    # examples/strip_chart_demo.py
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    maxt, dt = 10, 0.01
+    line, = ax.plot([], [], animated=blit)
+    data = StreamingLine(line, int(maxt / dt) + 1, scroll=1.0)
+    data.append(0, 0)
+    ax.set_ylim(-.1, 1.1)
+    ax.set_xlim(0, maxt)
+    state = {'t': 0}
+
+    def update(y):
+        state['t'] += dt
+        data.append(state['t'], y)
+        return data.update(),
+
+    def emitter():
+        while True:
+            v = np.random.rand()
+            if v > 0.01:
+                yield 0.
+            else:
+                yield np.random.rand()
+
+    return [FuncAnimation(fig, update, emitter, interval=10, blit=blit,
+        event_source=source)]
+
+
+def dynamic_image(blit, source):
+    # examples/dynamic_image.py
+    fig = plt.figure()
+    x = np.linspace(0, 2 * np.pi, 120)
+    y = np.linspace(0, 2 * np.pi, 100).reshape(-1, 1)
+    im = plt.imshow(np.sin(x) + np.cos(y), cmap=plt.get_cmap('jet'))
+
+    def update(i):
+        im.set_array(np.sin(x + i * np.pi / 15.) + np.cos(y + i * np.pi / 20.))
+        return im,
+
+    return [FuncAnimation(fig, update, interval=50, blit=blit,
+        event_source=source)]
+
+
+def dynamic_image2(blit, source):
+    # examples/dynamic_image2.py
+    fig = plt.figure()
+    x = np.linspace(0, 2 * np.pi, 120)
+    y = np.linspace(0, 2 * np.pi, 100).reshape(-1, 1)
+    ims = []
+    for i in range(60):
+        x += np.pi / 15.
+        y += np.pi / 20.
+        ims.append([plt.imshow(np.sin(x) + np.cos(y),
+            cmap=plt.get_cmap('jet'))])
+    return [ArtistAnimation(fig, ims, interval=50, blit=blit,
+        event_source=source)]
+
+
+def histogram(blit, source):
+    # examples/histogram.py
+    import matplotlib.patches as patches
+    import matplotlib.path as path
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    n, bins = np.histogram(np.random.randn(1000), 100)
+    left = np.array(bins[:-1])
+    right = np.array(bins[1:])
+    bottom = np.zeros(len(left))
+    nverts = len(left) * 5
+    verts = np.zeros((nverts, 2))
+    codes = np.ones(nverts, int) * path.Path.LINETO
+    codes[0::5] = path.Path.MOVETO
+    codes[4::5] = path.Path.CLOSEPOLY
+    verts[0::5,0] = left
+    verts[1::5,0] = left
+    verts[2::5,0] = right
+    verts[3::5,0] = right
+    patch = patches.PathPatch(path.Path(verts, codes), facecolor='green',
+        edgecolor='yellow', alpha=0.5)
+    ax.add_patch(patch)
+    ax.set_xlim(left[0], right[-1])
+    ax.set_ylim(0, 50)
+
+    def update(i):
+        n, bins = np.histogram(np.random.randn(1000), 100)
+        verts[1::5,1] = bottom + n
+        verts[2::5,1] = bottom + n
+        return patch,
+
+    return [FuncAnimation(fig, update, 100, blit=blit, event_source=source)]
+
+
+def multi_figs(blit, source):
+    # examples/multi_figs.py, two figures driven by one event source
+    count = 400
+    t = np.linspace(0, 80, count)
+    x = np.cos(2 * np.pi * t / 10.)
+    y = np.sin(2 * np.pi * t / 10.)
+    z = 10 * t
+
+    def add_lines(ax, ylim):
+        lines = [Line2D([], [], color='black'),
+            Line2D([], [], color='red', linewidth=2),
+            Line2D([], [], color='red', marker='o', markeredgecolor='r')]
+        for line in lines:
+            ax.add_line(line)
+        ax.set_xlim(-1, 1)
+        ax.set_ylim(*ylim)
+        return lines
+
+    def set_lines(lines, i, a, b):
+        head_slice = (t > t[i] - 1.0) & (t < t[i])
+        lines[0].set_data(a[:i], b[:i])
+        lines[1].set_data(a[head_slice], b[head_slice])
+        lines[2].set_data(a[i - 1], b[i - 1])
+        return lines
+
+    fig1 = plt.figure()
+    line1 = add_lines(fig1.add_subplot(1, 1, 1), (-2, 2))
+    fig2 = plt.figure()
+    line2 = add_lines(fig2.add_subplot(2, 1, 1), (0, 800))
+    line3 = add_lines(fig2.add_subplot(2, 1, 2), (0, 800))
+
+    def left(i):
+        return set_lines(line1, i, x, y)
+
+    def right(i):
+        return set_lines(line2, i, y, z) + set_lines(line3, i, x, z)
+
+    return [FuncAnimation(fig1, left, count, blit=blit, event_source=source),
+        FuncAnimation(fig2, right, count, blit=blit, event_source=source)]
+
+
+class SubplotAnimation(TimedAnimation):
+    # examples/subplots.py
+    def __init__(self, blit, source):
+        fig = plt.figure()
+        axes = [fig.add_subplot(1, 2, 1), fig.add_subplot(2, 2, 2),
+            fig.add_subplot(2, 2, 4)]
+        self.t = np.linspace(0, 80, 400)
+        x = np.cos(2 * np.pi * self.t / 10.)
+        y = np.sin(2 * np.pi * self.t / 10.)
+        z = 10 * self.t
+        self.data = [(x, y), (y, z), (x, z)]
+        self.lines = []
+        for ax, ylim in zip(axes, [(-2, 2), (0, 800), (0, 800)]):
+            lines = [Line2D([], [], color='black'),
+                Line2D([], [], color='red', linewidth=2),
+                Line2D([], [], color='red', marker='o', markeredgecolor='r')]
+            for line in lines:
+                ax.add_line(line)
+            ax.set_xlim(-1, 1)
+            ax.set_ylim(*ylim)
+            self.lines.append(lines)
+        TimedAnimation.__init__(self, fig, interval=50, blit=blit,
+            event_source=source)
+
+    def _draw_frame(self, framedata):
+        i = framedata
+        head_slice = (self.t > self.t[i] - 1.0) & (self.t < self.t[i])
+        self._drawn_artists = []
+        for lines, (a, b) in zip(self.lines, self.data):
+            lines[0].set_data(a[:i], b[:i])
+            lines[1].set_data(a[head_slice], b[head_slice])
+            lines[2].set_data(a[i - 1], b[i - 1])
+            self._drawn_artists.extend(lines)
+
+    def new_frame_seq(self):
+        return iter(range(self.t.size))
+
+    def _init_draw(self):
+        for lines in self.lines:
+            for l in lines:
+                l.set_data([], [])
+
+
+def subplots(blit, source):
+    return [SubplotAnimation(blit, source)]
+
+
+def simple_3danim(blit, source):
+    # examples/simple_3danim.py, which doesn't blit
+    import mpl_toolkits.mplot3d.axes3d as p3
+    fig = plt.figure()
+    ax = p3.Axes3D(fig)
+    data = [np.cumsum((np.random.rand(3, 25) - 0.5) * 0.1, axis=1) + 0.5
+        for index in xrange(50)]
+    lines = [ax.plot(dat[0, 0:1], dat[1, 0:1], dat[2, 0:1])[0]
+        for dat in data]
+    ax.set_xlim3d([0.0, 1.0])
+    ax.set_ylim3d([0.0, 1.0])
+    ax.set_zlim3d([0.0, 1.0])
+
+    def update(num):
+        for line, dat in zip(lines, data):
+            line.set_data(dat[0:2, :num])
+            line.set_3d_properties(dat[2, :num])
+        return lines
+
+    return [FuncAnimation(fig, update, 25, event_source=source)]
+
+
+# Workloads and whether they can be blitted.
+WORKLOADS = [('strip_chart', strip_chart, True),
+    ('dynamic_image', dynamic_image, True),
+    ('dynamic_image2', dynamic_image2, True),
+    ('histogram', histogram, True),
+    ('multi_figs', multi_figs, True),
+    ('subplots', subplots, True),
+    ('simple_3danim', simple_3danim, False)]
+
+
+def _null_encoder_cmd(fname, fps, codec, frame_prefix, frame_size=None):
+    # Stands in for ffmpeg when measuring save throughput, so no encoder
+    # needs to be installed: reads and throws away streamed frames, and
+    # ignores the image files otherwise.
+    if frame_size is None:
+        return [sys.executable, '-c', 'pass']
+    return [sys.executable, '-c', 'import sys\n'
+        'while sys.stdin.read(1 << 20): pass']
+
+
+def time_save(anim, stream):
+    # Times anim.save() with the null encoder, writing the image files (when
+    # not streaming) to a scratch directory. Returns a dictionary of results.
+    anim.ffmpeg_cmd = _null_encoder_cmd
+    draw_save_frame = anim._draw_save_frame
+    saved = []
+    def counted(framedata):
+        saved.append(None)
+        return draw_save_frame(framedata)
+    anim._draw_save_frame = counted
+
+    scratch = tempfile.mkdtemp()
+    try:
+        start = time.time()
+        anim.save(os.devnull, frame_prefix=os.path.join(scratch, '_tmp'),
+            stream=stream)
+        elapsed = time.time() - start
+    finally:
+        shutil.rmtree(scratch)
+        del anim._draw_save_frame
+    return dict(frames=len(saved), seconds=elapsed,
+        fps=len(saved) / elapsed if elapsed else 0.0)
+
+
+def run_workload(build, blit, frames, save):
+    # Runs *frames* ticks of the animations made by *build* and returns a
+    # dictionary of results.
+    source = FakeEventSource()
+    anims = build(blit, source)
+    figures = []
+    for anim in anims:
+        if anim._fig not in figures:
+            figures.append(anim._fig)
+
+    # The first draw of each figure starts its animations.
+    start = time.time()
+    for fig in figures:
+        fig.canvas.draw()
+    first_draw = time.time() - start
+
+    start = time.time()
+    ticks = 0
+    while ticks < frames and source.callbacks:
+        # Without an event loop, Agg carries out draw_idle() right away, so
+        # this includes the full redraws when not blitting.
+        source.fire()
+        ticks += 1
+    elapsed = time.time() - start
+
+    result = dict(frames=ticks, seconds=elapsed,
+        fps=ticks / elapsed if elapsed else 0.0, first_draw=first_draw,
+        stages=anims[0].stats.summary())
+
+    if save:
+        # Both ways save() can write frames: as image files for the movie
+        # program to read, and streamed into it.
+        result['save'] = dict(png=time_save(anims[0], False),
+            stream=time_save(anims[0], True))
+
+    plt.close('all')
+    return result
+
+
+def _run_in_process(queue, name, blit, frames, save):
+    import resource
+    build = dict((w[0], w[1]) for w in WORKLOADS)[name]
+    try:
+        result = run_workload(build, blit, frames, save)
+    except Exception, e:
+        result = dict(error='%s: %s' % (e.__class__.__name__, e))
+    result['peak_rss_kb'] = resource.getrusage(
+        resource.RUSAGE_SELF).ru_maxrss
+    queue.put(result)
+
+
+def run_all(names=None, frames=100, save=True):
+    '''
+    Runs the workloads in *names* (all of them by default) for *frames* frames
+    each, every one in a fresh process. Returns a list of result dictionaries.
+    '''
+    from multiprocessing import Process, Queue
+    results = []
+    for name, build, can_blit in WORKLOADS:
+        if names and name not in names:
+            continue
+        for blit in ([False, True] if can_blit else [False]):
+            queue = Queue()
+            proc = Process(target=_run_in_process,
+                args=(queue, name, blit, frames, save))
+            proc.start()
+            result = queue.get()
+            proc.join()
+            result.update(workload=name, blit=blit)
+            results.append(result)
+    return results
+
+
+def _describe_run():
+    # Identifies what was benchmarked, so that results can be compared.
+    import platform
+    from subprocess import Popen, PIPE
+    try:
+        proc = Popen(['git', 'rev-parse', 'HEAD'], stdout=PIPE, stderr=PIPE,
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        commit = proc.communicate()[0].strip() or None
+    except OSError:
+        commit = None
+    return dict(commit=commit, python=platform.python_version(),
+        matplotlib=matplotlib.__version__, numpy=np.__version__,
+        platform=platform.platform(), time=time.time())
+
+
+if __name__ == '__main__':
+    parser = OptionParser(usage='%prog [options] [workload ...]')
+    parser.add_option('-n', '--frames', type='int', default=100,
+        help='number of frames to run each workload for')
+    parser.add_option('-o', '--output', default=None,
+        help='file to write the JSON results to, instead of stdout')
+    parser.add_option('--no-save', action='store_false', dest='save',
+        default=True, help="don't measure the throughput of save()")
+    opts, names = parser.parse_args()
+
+    report = dict(run=_describe_run(), results=run_all(names, opts.frames,
+        opts.save))
+    if opts.output:
+        out = open(opts.output, 'w')
+    else:
+        out = sys.stdout
+    json.dump(report, out, indent=2, sort_keys=True)
+    out.write('\n')
+    if opts.output:
+        out.close()
@@ -27,7 +27,6 @@ def run(data):
 
     if t >= xmax:
         ax.set_xlim(xmin, 2*xmax)
-        ax.figure.canvas.draw()
     line.set_data(xdata, ydata)
 
     return line,
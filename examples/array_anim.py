@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+Animate the slices of a 3D array kept in a memory mapped file, using a
+single image, so only the frame on screen needs to be in memory.
+"""
+import os
+import tempfile
+import numpy as np
+import matplotlib.pyplot as plt
+from animation import ArrayAnimation
+
+def f(x, y):
+    return np.sin(x) + np.cos(y)
+
+x = np.linspace(0, 2 * np.pi, 120)
+y = np.linspace(0, 2 * np.pi, 100).reshape(-1, 1)
+
+# Write the frames to disk, as a simulation would
+fd, path = tempfile.mkstemp(suffix='.dat')
+os.close(fd)
+data = np.memmap(path, dtype=np.float32, mode='w+', shape=(60, 100, 120))
+for i in range(60):
+    x += np.pi / 15.
+    y += np.pi / 20.
+    data[i] = f(x, y)
+data.flush()
+del data
+
+data = np.memmap(path, dtype=np.float32, mode='r', shape=(60, 100, 120))
+fig = plt.figure()
+ani = ArrayAnimation(fig, data, image_kw=dict(cmap=plt.get_cmap('jet'),
+    vmin=-2, vmax=2), prefetch=4, interval=50, blit=True, repeat_delay=1000)
+plt.show()
+
+del data
+os.remove(path)
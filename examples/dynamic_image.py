@@ -4,7 +4,7 @@ An animated image
 """
 import numpy as np
 import matplotlib.pyplot as plt
-from animation import FuncAnimation
+from animation import FuncAnimation, ColormapLUT
 
 fig = plt.figure()
 
@@ -14,14 +14,15 @@ def f(x, y):
 x = np.linspace(0, 2 * np.pi, 120)
 y = np.linspace(0, 2 * np.pi, 100).reshape(-1, 1)
 
-im = plt.imshow(f(x, y), cmap=plt.get_cmap('jet'))
+im = plt.imshow(f(x, y), cmap=plt.get_cmap('jet'), interpolation='nearest')
+# f() stays within [-2, 2], so the colors can be looked up from a fixed table
+lut = ColormapLUT(im, -2, 2)
 
 def updatefig(*args):
     global x,y
     x += np.pi / 15.
     y += np.pi / 20.
-    im.set_array(f(x,y))
-    return im,
+    return lut.update(f(x,y)),
 
 ani = FuncAnimation(fig, updatefig, interval=50, blit=True)
 plt.show()
@@ -1,7 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.lines import Line2D
-from animation import FuncAnimation
+from animation import FuncAnimation, AnimationGroup
 
 
 fig1 = plt.figure()
@@ -80,11 +80,14 @@ def draw_right_frame(i, lines1, lines2, x, y, z, t) :
 
     return lines1 + lines2
 
+# Both animations are driven by one timer, which steps them together.
+group = AnimationGroup(fig1, interval=250)
+
 fig1Anim = FuncAnimation(fig1, draw_left_frame, frameCnt, fargs=(line1, x, y, z, t),
-                               interval=250, blit=True)
+                               interval=250, event_source=group, blit=True)
 
 fig2Anim = FuncAnimation(fig2, draw_right_frame, frameCnt, fargs=(line2, line3, x, y, z, t),
-                               event_source=fig1Anim.event_source, blit=True)
+                               interval=250, event_source=group, blit=True)
 
 #ani.save('test_sub.mp4')
 plt.show()
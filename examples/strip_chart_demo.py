@@ -4,34 +4,27 @@ matplotlib 1.0 SVN.
 """
 import matplotlib
 import numpy as np
-from matplotlib.lines import Line2D
 import matplotlib.pyplot as plt
-from animation import FuncAnimation
+from animation import FuncAnimation, StreamingLine
 
 class Scope:
     def __init__(self, ax, maxt=10, dt=0.01):
         self.ax = ax
         self.dt = dt
         self.maxt = maxt
-        self.tdata = [0]
-        self.ydata = [0]
-        self.line = Line2D(self.tdata, self.ydata)
-        self.ax.add_line(self.line)
+        self.t = 0
+        line, = self.ax.plot([], [], animated=True)
+        # Keep one screenful of points, and jump a whole screen when the
+        # trace reaches the right edge.
+        self.data = StreamingLine(line, int(maxt / dt) + 1, scroll=1.0)
+        self.data.append(0, 0)
         self.ax.set_ylim(-.1, 1.1)
         self.ax.set_xlim(0, self.maxt)
 
     def update(self, y):
-        lastt = self.tdata[-1]
-        if lastt > self.tdata[0] + self.maxt: # reset the arrays
-            self.tdata = [self.tdata[-1]]
-            self.ydata = [self.ydata[-1]]
-            self.ax.set_xlim(self.tdata[0], self.tdata[0] + self.maxt)
-
-        t = self.tdata[-1] + self.dt
-        self.tdata.append(t)
-        self.ydata.append(y)
-        self.line.set_data(self.tdata, self.ydata)
-        return self.line,
+        self.t += self.dt
+        self.data.append(self.t, y)
+        return self.data.update(),
 
 def emitter(p=0.01):
     'return a random value with probability p, else 0'
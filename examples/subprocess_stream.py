@@ -0,0 +1,51 @@
+"""
+Plot binary telemetry streamed from the stdout of a subprocess. The records
+are read and decoded on a background thread, so the GUI never blocks waiting
+for the subprocess.
+"""
+import subprocess
+import sys
+import numpy as np
+import matplotlib.pyplot as plt
+from animation import FuncAnimation, StreamEventSource
+
+# Each record is a timestamp and a reading
+record = np.dtype([('t', '<f8'), ('value', '<f4')])
+
+# Stands in for a data acquisition program, writing 1000 records a second
+producer = '''
+import sys, time
+import numpy as np
+record = np.dtype([('t', '<f8'), ('value', '<f4')])
+buf = np.zeros(100, dtype=record)
+value = 0.
+for i in range(200):
+    buf['t'] = np.arange(i * 100, (i + 1) * 100) / 1000.
+    buf['value'] = value + np.random.randn(100).cumsum()
+    value = buf['value'][-1]
+    sys.stdout.write(buf.tostring())
+    sys.stdout.flush()
+    time.sleep(0.1)
+'''
+proc = subprocess.Popen([sys.executable, '-c', producer],
+    stdout=subprocess.PIPE)
+
+fig = plt.figure()
+ax = fig.add_subplot(111)
+line, = ax.plot([], [])
+ax.set_xlim(0, 20)
+ax.set_ylim(-100, 100)
+tdata = []
+ydata = []
+
+def update(records):
+    tdata.extend(records['t'])
+    ydata.extend(records['value'])
+    line.set_data(tdata, ydata)
+    return line,
+
+source = StreamEventSource(proc, record, fig, interval=30, mode='batch')
+ani = FuncAnimation(fig, update, source.frames, event_source=source,
+    init_func=lambda: [line], repeat=False)
+plt.show()
+proc.wait()
@@ -0,0 +1,50 @@
+"""
+Plot numbers as they are appended to a file. A background thread stands in
+for some other program writing to the file; the animation only redraws when
+new lines show up.
+"""
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from animation import FuncAnimation, FileEventSource, FileTail
+
+fd, path = tempfile.mkstemp(suffix='.txt')
+os.close(fd)
+
+def writer():
+    f = open(path, 'a')
+    while True:
+        # Bursts of values at irregular times
+        time.sleep(np.random.exponential(0.5))
+        for v in np.random.randn(np.random.randint(1, 20)).cumsum():
+            f.write('%f\n' % v)
+        f.flush()
+
+thread = threading.Thread(target=writer)
+thread.daemon = True
+thread.start()
+
+fig = plt.figure()
+ax = fig.add_subplot(111)
+line, = ax.plot([], [])
+ydata = []
+
+def update(values):
+    ydata.extend(values)
+    line.set_data(np.arange(len(ydata)), ydata)
+    ax.relim()
+    ax.autoscale_view()
+    return line,
+
+tail = FileTail(path, parser=float)
+source = FileEventSource(path, fig, interval=50)
+ani = FuncAnimation(fig, update, tail.frames, event_source=source,
+    init_func=lambda: [line])
+plt.show()
+
+source.close()
+tail.close()
+os.remove(path)